@@ -1,43 +1,270 @@
 import discord
 from redbot.core import commands, Config
+from redbot.core.data_manager import cog_data_path
+import asyncio
 import datetime
+import logging
+import re
+
+from varislib import http, metrics_cog
+from varislib.snapshot import SnapshotStore
+
+from .api_server import AnnouncementsAPI
+from .avatar_cache import AvatarCache
+from .feeds import AnnouncementFeed, DEFAULT_SERVER
+from .fivem_poller import FiveMPoller, check_endpoint, is_private_literal
+from .history import AnnouncementHistory
+
+log = logging.getLogger("red.announcements")
+
+# Feed served by the unscoped endpoints unless the owner picks a default with setdefault
+LEGACY_KEY = (0, DEFAULT_SERVER)
+CACHED_AVATAR = re.compile(r"/avatars/([0-9a-f]+)_\d+\.png$")
 
 class Announcements(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = Config.get_conf(self, identifier=1234567890)
-        self.config.register_guild(announcement_channel=None)
-        self.latest_announcement = {
-            "username": "Red",
-            "avatar": "https://api.hexios.top/static/avatar.png",
-            "message": "Server is offline."
-        }
+        # servers: {server_id: {"channels": [channel_id, ...], "webhooks": [url, ...], "endpoint": url}}
+        self.config.register_guild(announcement_channel=None, servers={})
+        self.config.register_global(
+            api_host="127.0.0.1",
+            api_port=8765,
+            default_feed=None,
+            poll_interval=30,
+            public_url=None,
+            allow_private_endpoints=False,
+            metrics_token=None,
+        )
+        self.history = AnnouncementHistory()
+        self.feeds = {}  # {(guild_id, server_id): AnnouncementFeed}
+        self.default_feed_key = None
+        self.api = None
+        self.public_url = None  # Base URL for cached avatar links; avatars stay on the CDN without one
+        self.metrics_token = None  # Bearer token required by /metrics; disabled without one
+        self.avatars = None
+        self.http = None
+        self.snapshots = None  # Poller state; announcements themselves persist in the history database
+        self.poller = FiveMPoller(self)
+
+    async def cog_load(self):
+        self.http = http.acquire("announcements")
+        await metrics_cog.attach(self.bot, "announcements")
+        await self.history.open(str(cog_data_path(self) / "history.sqlite3"))
+        self.avatars = AvatarCache(cog_data_path(self) / "avatars", pinned=self.linked_avatars)
+        await self.avatars.open()
+        self.avatars.start(self.http.session("discord-cdn"))
+        # Index every feed that has history or configuration so its API path resolves immediately
+        for name in self.history.feeds():
+            guild_id, server_id = name.split("/", 1)
+            self.get_feed((int(guild_id), server_id), create=True)
+        for guild_id, data in (await self.config.all_guilds()).items():
+            for server_id in data.get("servers", {}):
+                self.get_feed((guild_id, server_id), create=True)
+        self.get_feed(LEGACY_KEY, create=True)
+
+        self.metrics_token = await self.config.metrics_token()
+        self.public_url = await self.config.public_url()
+        default_feed = await self.config.default_feed()
+        self.default_feed_key = tuple(default_feed) if default_feed else None
+        await self.start_api()
+
+        self.poller.interval = await self.config.poll_interval()
+        await self.refresh_poll_targets()
+        self.snapshots = SnapshotStore(cog_data_path(self) / "state.snapshot", self.snapshot_state)
+        state = await self.snapshots.load()
+        if state:
+            self.poller.restore(state.get("poller", {}))
+        self.snapshots.start()
+        self.poller.start(self.http.session("fivem"))
+
+    async def cog_unload(self):
+        await self.poller.stop()
+        if self.snapshots:
+            await self.snapshots.stop()
+        if self.avatars:
+            await self.avatars.stop()
+        for feed in self.feeds.values():
+            feed.close()
+        if self.api:
+            await self.api.stop()
+        await self.history.close()
+        await http.release("announcements")
+        await metrics_cog.detach(self.bot, "announcements")
+
+    async def start_api(self, host=None, port=None):
+        """Start the HTTP API (by default on the configured host and port).
+
+        A running API is only replaced once the new address is bound, so a bad host or a
+        port in use leaves it serving. Returns whether the API now listens on the address.
+        """
+        host = host or await self.config.api_host()
+        port = port or await self.config.api_port()
+        old = self.api
+        if old and (old.host, old.port) == (host, port):
+            return True
+
+        api = AnnouncementsAPI(self, host, port)
+        try:
+            await api.start()
+        except OSError as e:
+            if old is None or old.port != port:
+                log.error(f"Failed to start announcements API on {host}:{port}: {e}")
+                return False
+            # Same port on another interface: the old listener has to go first
+            await old.stop()
+            try:
+                await api.start()
+            except OSError as e:
+                log.error(f"Failed to start announcements API on {host}:{port}: {e}")
+                await old.start()
+                return False
+        if old:
+            await old.stop()
+        self.api = api
+        return True
+
+    def snapshot_state(self):
+        return {"poller": self.poller.export()}
+
+    async def refresh_poll_targets(self):
+        """Point the FiveM poller at every server that has an endpoint configured."""
+        allow_private = await self.config.allow_private_endpoints()
+        targets = {}
+        for guild_id, data in (await self.config.all_guilds()).items():
+            for server_id, server in data.get("servers", {}).items():
+                endpoint = server.get("endpoint")
+                if not endpoint:
+                    continue
+                if not allow_private and is_private_literal(endpoint):
+                    log.warning(f"Not polling {guild_id}/{server_id}: {endpoint} is a private address.")
+                    continue
+                targets[(guild_id, server_id)] = endpoint
+                self.get_feed((guild_id, server_id), create=True)
+        self.poller.set_targets(targets)
+
+    def localize_avatar(self, url, size=128):
+        """Swap a Discord CDN avatar URL for the API's cached, resized copy when there is one.
+
+        Only done once a public URL is set, since the bot can't know how clients reach the API.
+        Never waits on the CDN: an avatar that isn't cached yet is fetched in the background
+        and the original URL is used until it is.
+        """
+        if not isinstance(url, str) or not url or self.avatars is None or not self.public_url:
+            return url
+        digest = self.avatars.cached(url)
+        if digest is None:
+            self.avatars.prefetch(url)
+            return url
+        return f"{self.public_url}/avatars/{digest}_{size}.png"
+
+    def linked_avatars(self):
+        """Digests of the cached avatars the feeds' latest announcements link to."""
+        digests = set()
+        for feed in self.feeds.values():
+            match = CACHED_AVATAR.search(feed.latest_entry.get("avatar") or "")
+            if match:
+                digests.add(match.group(1))
+        return digests
+
+    def get_feed(self, key, create=False):
+        """Look up the feed for a (guild_id, server_id) key."""
+        feed = self.feeds.get(key)
+        if feed is None and create:
+            feed = self.feeds[key] = AnnouncementFeed(key, self.history)
+        return feed
+
+    def default_feed(self):
+        """The feed served by the unscoped /announcements endpoints."""
+        # Unscoped clients only ever reach the chosen default, the only guild's feed or the legacy feed
+        feed = self.get_feed(self.default_feed_key) if self.default_feed_key else None
+        return feed or self.get_feed(self.implicit_default_key(), create=True)
+
+    def implicit_default_key(self):
+        """The feed to serve unscoped when no default is chosen.
+
+        With a single guild, that is its default server (what `fivemstatus` posts to), or its
+        only server. Otherwise nothing is guessed and the legacy feed is used.
+        """
+        keys = [key for key in self.feeds if key != LEGACY_KEY]
+        if len({guild_id for guild_id, _ in keys}) != 1:
+            return LEGACY_KEY
+        guild_id = keys[0][0]
+        if (guild_id, DEFAULT_SERVER) in self.feeds:
+            return guild_id, DEFAULT_SERVER
+        return keys[0] if len(keys) == 1 else LEGACY_KEY
+
+    @property
+    def latest_announcement(self):
+        return self.default_feed().latest_announcement
+
+    def set_announcement(self, username, avatar, message, key=None):
+        """Record a new announcement on a feed (the default feed if no key is given)."""
+        feed = self.get_feed(key, create=True) if key else self.default_feed()
+        return feed.publish(username, avatar, message)
 
     @commands.command()
+    @commands.guild_only()
     async def fivemstatus(self, ctx, *, status: str):
         """Update FiveM status."""
-        self.latest_announcement = {
-            "username": ctx.author.display_name,
-            "avatar": ctx.author.avatar.url if ctx.author.avatar else "",
-            "message": f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {status}"
-        }
+        await self.post_status(ctx, DEFAULT_SERVER, status)
+
+    @commands.command()
+    @commands.guild_only()
+    async def serverstatus(self, ctx, server_id: str, *, status: str):
+        """Update the status of one configured FiveM server."""
+        servers = await self.config.guild(ctx.guild).servers()
+        if server_id != DEFAULT_SERVER and server_id not in servers:
+            await ctx.send(f"⚠️ Unknown server `{server_id}`. Add it with `{ctx.clean_prefix}announcements addserver`.")
+            return
+        await self.post_status(ctx, server_id, status)
+
+    async def post_status(self, ctx, server_id, status):
+        avatar = ctx.author.avatar.url if ctx.author.avatar else ""
+        entry = self.set_announcement(
+            username=ctx.author.display_name,
+            avatar=self.localize_avatar(avatar),
+            message=f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {status}",
+            key=(ctx.guild.id, server_id)
+        )
         await ctx.send(f"✅ Status updated: `{status}`")
+        await self.deliver(ctx.guild, server_id, entry, avatar)
 
-        # Send the announcement to the configured channel
-        channel_id = await self.config.guild(ctx.guild).announcement_channel()
-        if channel_id:
-            channel = ctx.guild.get_channel(channel_id)
-            if channel:
-                embed = discord.Embed(
-                    title="📢 Server Announcement",
-                    description=self.latest_announcement["message"],
-                    color=discord.Color.blue()
-                )
-                embed.set_author(
-                    name=self.latest_announcement["username"],
-                    icon_url=self.latest_announcement["avatar"]
-                )
-                await channel.send(embed=embed)
+    async def deliver(self, guild, server_id, entry, avatar=None):
+        """Send an announcement to every channel and webhook configured for a server, concurrently."""
+        # Discord can't reach the local API, so embeds keep the original avatar URL
+        avatar = entry["avatar"] if avatar is None else avatar
+        guild_config = await self.config.guild(guild).all()
+        server = guild_config["servers"].get(server_id, {})
+        channel_ids = list(server.get("channels", []))
+        if server_id == DEFAULT_SERVER and guild_config["announcement_channel"]:
+            channel_ids.append(guild_config["announcement_channel"])
+
+        title = "📢 Server Announcement" if server_id == DEFAULT_SERVER else f"📢 Server Announcement ({server_id})"
+        embed = discord.Embed(
+            title=title,
+            description=entry["message"],
+            color=discord.Color.blue()
+        )
+        embed.set_author(
+            name=entry["username"],
+            icon_url=avatar or None
+        )
+
+        sends = [
+            channel.send(embed=embed)
+            for channel in map(guild.get_channel, dict.fromkeys(channel_ids))
+            if channel is not None
+        ]
+        sends += [
+            discord.Webhook.from_url(url, client=self.bot).send(
+                embed=embed, username=entry["username"], avatar_url=avatar or None
+            )
+            for url in server.get("webhooks", [])
+        ]
+        for result in await asyncio.gather(*sends, return_exceptions=True):
+            if isinstance(result, Exception):
+                log.error(f"Failed to deliver announcement for {guild.id}/{server_id}: {result}")
 
     @commands.group()
     async def announcements(self, ctx):
@@ -45,18 +272,23 @@ class Announcements(commands.Cog):
         pass
 
     @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
     async def setchannel(self, ctx, channel: discord.TextChannel):
         """Set the announcement channel."""
         await self.config.guild(ctx.guild).announcement_channel.set(channel.id)
         await ctx.send(f"✅ Announcement channel set to {channel.mention}.")
 
     @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
     async def clearchannel(self, ctx):
         """Clear the announcement channel."""
         await self.config.guild(ctx.guild).announcement_channel.set(None)
         await ctx.send("✅ Announcement channel cleared.")
 
     @announcements.command()
+    @commands.guild_only()
     async def getchannel(self, ctx):
         """Get the currently configured announcement channel."""
         channel_id = await self.config.guild(ctx.guild).announcement_channel()
@@ -69,11 +301,251 @@ class Announcements(commands.Cog):
         else:
             await ctx.send("⚠️ No announcement channel is configured.")
 
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def addserver(self, ctx, server_id: str):
+        """Add a FiveM server with its own announcement feed."""
+        if "/" in server_id:
+            await ctx.send("⚠️ Server ids can't contain `/`.")
+            return
+        async with self.config.guild(ctx.guild).servers() as servers:
+            if server_id in servers:
+                await ctx.send(f"⚠️ Server `{server_id}` already exists.")
+                return
+            servers[server_id] = {"channels": [], "webhooks": []}
+        self.get_feed((ctx.guild.id, server_id), create=True)
+        await ctx.send(f"✅ Server `{server_id}` added. API path: `/announcements/{ctx.guild.id}/{server_id}`")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def removeserver(self, ctx, server_id: str):
+        """Remove a FiveM server and stop serving its feed."""
+        async with self.config.guild(ctx.guild).servers() as servers:
+            if servers.pop(server_id, None) is None:
+                await ctx.send(f"⚠️ Server `{server_id}` is not configured.")
+                return
+        feed = self.feeds.pop((ctx.guild.id, server_id), None)
+        if feed:
+            feed.close()
+        await self.refresh_poll_targets()
+        await ctx.send(f"✅ Server `{server_id}` removed.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def addchannel(self, ctx, server_id: str, channel: discord.TextChannel):
+        """Post a server's announcements to an additional channel."""
+        async with self.config.guild(ctx.guild).servers() as servers:
+            server = servers.setdefault(server_id, {"channels": [], "webhooks": []})
+            if channel.id not in server["channels"]:
+                server["channels"].append(channel.id)
+        self.get_feed((ctx.guild.id, server_id), create=True)
+        await ctx.send(f"✅ `{server_id}` announcements will be posted in {channel.mention}.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def removechannel(self, ctx, server_id: str, channel: discord.TextChannel):
+        """Stop posting a server's announcements to a channel."""
+        async with self.config.guild(ctx.guild).servers() as servers:
+            server = servers.get(server_id)
+            if not server or channel.id not in server["channels"]:
+                await ctx.send(f"⚠️ {channel.mention} is not configured for `{server_id}`.")
+                return
+            server["channels"].remove(channel.id)
+        await ctx.send(f"✅ {channel.mention} removed from `{server_id}`.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def addwebhook(self, ctx, server_id: str, url: str):
+        """Post a server's announcements to a webhook."""
+        try:
+            await ctx.message.delete()  # Webhook URLs are secrets
+        except discord.HTTPException:
+            pass
+        async with self.config.guild(ctx.guild).servers() as servers:
+            server = servers.setdefault(server_id, {"channels": [], "webhooks": []})
+            if url not in server["webhooks"]:
+                server["webhooks"].append(url)
+        self.get_feed((ctx.guild.id, server_id), create=True)
+        await ctx.send(f"✅ Webhook added to `{server_id}`.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def removewebhooks(self, ctx, server_id: str):
+        """Remove all webhooks from a server."""
+        async with self.config.guild(ctx.guild).servers() as servers:
+            server = servers.get(server_id)
+            if not server or not server["webhooks"]:
+                await ctx.send(f"⚠️ `{server_id}` has no webhooks.")
+                return
+            server["webhooks"] = []
+        await ctx.send(f"✅ Webhooks removed from `{server_id}`.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def servers(self, ctx):
+        """List the configured FiveM servers."""
+        servers = await self.config.guild(ctx.guild).servers()
+        if not servers:
+            await ctx.send("⚠️ No servers are configured. `fivemstatus` uses the default server.")
+            return
+        lines = []
+        for server_id, server in servers.items():
+            channels = ", ".join(f"<#{channel_id}>" for channel_id in server["channels"]) or "no channels"
+            lines.append(
+                f"`{server_id}`: {channels}, {len(server['webhooks'])} webhook(s), "
+                f"API `/announcements/{ctx.guild.id}/{server_id}`"
+            )
+        await ctx.send("\n".join(lines))
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def setendpoint(self, ctx, server_id: str, url: str = None):
+        """Set a server's FiveM address (e.g. `http://1.2.3.4:30120`) to poll its status automatically.
+
+        Leave the url out to stop polling the server.
+        """
+        if url is not None:
+            try:
+                url = await check_endpoint(url, await self.config.allow_private_endpoints())
+            except ValueError as e:
+                await ctx.send(f"⚠️ {e}")
+                return
+        async with self.config.guild(ctx.guild).servers() as servers:
+            server = servers.setdefault(server_id, {"channels": [], "webhooks": []})
+            server["endpoint"] = url
+        await self.refresh_poll_targets()
+        if url:
+            await ctx.send(f"✅ Polling `{server_id}` at `{url}` every {self.poller.interval} seconds.")
+        else:
+            await ctx.send(f"✅ Stopped polling `{server_id}`.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def probe(self, ctx, server_id: str):
+        """Check a server's FiveM endpoint right now."""
+        servers = await self.config.guild(ctx.guild).servers()
+        endpoint = servers.get(server_id, {}).get("endpoint")
+        if not endpoint:
+            await ctx.send(f"⚠️ `{server_id}` has no endpoint. Set one with `{ctx.clean_prefix}announcements setendpoint`.")
+            return
+        if not self.poller.running:
+            await ctx.send("⚠️ The FiveM poller is not running.")
+            return
+        try:
+            # Re-checked here as well: the host may resolve elsewhere now, or predate the check
+            await check_endpoint(endpoint, await self.config.allow_private_endpoints())
+        except ValueError as e:
+            await ctx.send(f"⚠️ {e}")
+            return
+        status = await self.poller.probe(endpoint)
+        if status["online"]:
+            await ctx.send(f"🟢 `{status['hostname'] or server_id}` is online with {status['players']}/{status['max_players']} players.")
+        else:
+            await ctx.send(f"🔴 `{server_id}` is unreachable: {status['error']}")
+
+    @announcements.command()
+    @commands.is_owner()
+    async def pollinterval(self, ctx, seconds: int):
+        """Set how often FiveM endpoints are polled."""
+        if seconds < 5:
+            await ctx.send("⚠️ The interval must be at least 5 seconds.")
+            return
+        await self.config.poll_interval.set(seconds)
+        self.poller.interval = seconds
+        await ctx.send(f"✅ FiveM servers will be polled every {seconds} seconds.")
+
+    @announcements.command()
+    @commands.is_owner()
+    async def privateendpoints(self, ctx, allowed: bool):
+        """Allow FiveM endpoints on loopback and private networks (e.g. a server on the same host or LAN).
+
+        Off by default, so guild admins can't make the bot probe internal services.
+        """
+        await self.config.allow_private_endpoints.set(allowed)
+        await self.refresh_poll_targets()
+        if allowed:
+            await ctx.send("✅ FiveM endpoints may now use private and local addresses.")
+        else:
+            await ctx.send("✅ FiveM endpoints must now use public addresses.")
+
+    @announcements.command()
+    @commands.guild_only()
+    @commands.is_owner()
+    async def setdefault(self, ctx, server_id: str = None):
+        """Choose which of this guild's servers the unscoped /announcements endpoints serve.
+
+        Without a server id, a bot in a single guild serves that guild's default server (or its
+        only server), and any other bot serves the legacy feed that only unscoped updates write to.
+        """
+        if server_id is None:
+            await self.config.default_feed.set(None)
+            self.default_feed_key = None
+            await ctx.send("✅ `/announcements` now serves the default feed.")
+            return
+        self.default_feed_key = (ctx.guild.id, server_id)
+        self.get_feed(self.default_feed_key, create=True)
+        await self.config.default_feed.set(list(self.default_feed_key))
+        await ctx.send(f"✅ `/announcements` now serves `{server_id}`.")
+
+    @announcements.command()
+    @commands.is_owner()
+    async def setapi(self, ctx, host: str, port: int):
+        """Set the host and port the announcements API listens on."""
+        if not 0 < port < 65536:
+            await ctx.send("⚠️ Port must be between 1 and 65535.")
+            return
+        if not await self.start_api(host, port):
+            await ctx.send(f"⚠️ Could not bind to `{host}:{port}`; the API keeps its current address. Check the logs.")
+            return
+        await self.config.api_host.set(host)
+        await self.config.api_port.set(port)
+        await ctx.send(f"✅ Announcements API now listening on `{host}:{port}`.")
+
+    @announcements.command()
+    @commands.is_owner()
+    async def metricstoken(self, ctx, token: str = None):
+        """Require `Authorization: Bearer <token>` to read the API's `/metrics`.
+
+        `/metrics` is disabled until a token is set, even for local clients, since a reverse
+        proxy on the bot's host makes every request look local.
+        """
+        try:
+            await ctx.message.delete()  # Tokens are secrets
+        except discord.HTTPException:
+            pass
+        await self.config.metrics_token.set(token)
+        self.metrics_token = token
+        if token:
+            await ctx.send("✅ `/metrics` now requires the bearer token.")
+        else:
+            await ctx.send("✅ `/metrics` token cleared; the endpoint is disabled.")
+
+    @announcements.command()
+    @commands.is_owner()
+    async def setpublicurl(self, ctx, url: str = None):
+        """Set the public base URL of the API, used for cached avatar links (e.g. `https://status.example.com`).
+
+        Leave the url out to link avatars from Discord's CDN again.
+        """
+        if url is not None and not url.startswith(("http://", "https://")):
+            await ctx.send("⚠️ The URL must start with `http://` or `https://`.")
+            return
+        self.public_url = url.rstrip("/") if url else None
+        await self.config.public_url.set(self.public_url)
+        if self.public_url:
+            await ctx.send(f"✅ Cached avatars will be linked from `{self.public_url}/avatars/`.")
+        else:
+            await ctx.send("✅ Avatars will be linked from Discord's CDN.")
+
     def get_latest(self):
         # Ensure the data is in a format suitable for JavaScript
-        return {
-            "username": self.latest_announcement["username"],
-            "avatar": self.latest_announcement["avatar"],
-            "message": self.latest_announcement["message"],
-            "timestamp": datetime.datetime.now().isoformat()
-        }
+        return self.default_feed().latest_entry
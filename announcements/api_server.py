@@ -1,37 +1,245 @@
-from flask import Flask, jsonify, request
-from redbot.core.bot import Red
-from announcements import Announcements
-from flask_cors import CORS
-
-app = Flask(__name__)
-CORS(app)
-bot: Red = None
-
-@app.route("/announcements", methods=["GET"])
-def get_announcements():
-    cog: Announcements = bot.get_cog("Announcements")
-    if cog:
-        return jsonify([cog.get_latest()])
-    return jsonify([])
-
-@app.route("/announcements/update", methods=["POST"])
-def update_announcement():
-    cog: Announcements = bot.get_cog("Announcements")
-    if not cog:
-        return jsonify({"error": "Announcements cog not loaded."}), 500
-
-    data = request.json
-    if not data or "message" not in data:
-        return jsonify({"error": "Invalid request. 'message' field is required."}), 400
-
-    cog.latest_announcement = {
-        "username": data.get("username", "System"),
-        "avatar": data.get("avatar", ""),
-        "message": data["message"]
+import asyncio
+import hmac
+import logging
+
+from aiohttp import web
+
+from varislib import metrics
+
+from .broadcast import sse_frame
+
+log = logging.getLogger("red.announcements")
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match, Last-Event-ID",
+}
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    # Loading screens and widgets call the API from other origins
+    if request.method == "OPTIONS":
+        response = web.Response(status=204)
+    else:
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            e.headers.update(CORS_HEADERS)
+            raise
+    response.headers.update(CORS_HEADERS)
+    return response
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    resource = request.match_info.route.resource
+    name = f"announcements.api {request.method} {resource.canonical if resource else 'unmatched'}"
+    # 4xx responses are raised as HTTPExceptions but are the client's problem, not errors
+    with metrics.track(name, ignore=(web.HTTPClientError,)):
+        return await handler(request)
+
+
+def cached_response(request, payload, cache_control):
+    """Serve a CachedPayload, answering conditional requests with 304."""
+    headers = {
+        "Cache-Control": cache_control,
+        "Last-Modified": payload.last_modified_header,
+        "Vary": "Accept-Encoding",
     }
-    return jsonify({"success": True, "message": "Announcement updated."})
+    gzip_ok = "gzip" in request.headers.get("Accept-Encoding", "")
+    headers["ETag"] = payload.gzip_etag if gzip_ok else payload.etag
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if payload.matches(if_none_match):
+            return web.Response(status=304, headers=headers)
+    elif request.if_modified_since and request.if_modified_since >= payload.last_modified:
+        return web.Response(status=304, headers=headers)
+
+    if gzip_ok:
+        headers["Content-Encoding"] = "gzip"
+        return web.Response(body=payload.gzipped, headers=headers, content_type="application/json")
+    return web.Response(body=payload.body, headers=headers, content_type="application/json")
+
+
+class AnnouncementsAPI:
+    """HTTP API for announcements, served on the bot's own event loop."""
+
+    # Short enough that status changes show up quickly, long enough for proxies to absorb polling
+    cache_control = "public, max-age=5, stale-while-revalidate=30"
+    max_page_size = 200
+    # Avatar URLs embed a hash of the image, so their content never changes
+    avatar_cache_control = "public, max-age=31536000, immutable"
+
+    def __init__(self, cog, host="127.0.0.1", port=8765, heartbeat=15):
+        self.cog = cog
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat  # Seconds between keep-alive comments on idle streams
+        self._runner = None
+
+    def build_app(self):
+        app = web.Application(middlewares=[cors_middleware, metrics_middleware])
+        # The unscoped paths serve the cog's default feed; scoped ones a single guild/server
+        app.add_routes([
+            web.get("/announcements", self.get_announcements),
+            web.post("/announcements/update", self.update_announcement),
+            web.get("/announcements/stream", self.stream_announcements),
+            web.get("/announcements/feeds", self.list_feeds),
+            web.get(r"/announcements/{guild_id:\d+}/{server_id}", self.get_announcements),
+            web.post(r"/announcements/{guild_id:\d+}/{server_id}/update", self.update_announcement),
+            web.get(r"/announcements/{guild_id:\d+}/{server_id}/stream", self.stream_announcements),
+            web.get(r"/avatars/{digest:[0-9a-f]+}_{size:\d+}.png", self.get_avatar),
+            web.get("/metrics", self.get_metrics),
+        ])
+        return app
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        runner = web.AppRunner(self.build_app(), access_log=None, shutdown_timeout=5)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port, backlog=1024).start()
+        except OSError:
+            await runner.cleanup()
+            raise
+        self._runner = runner
+        log.info(f"Announcements API listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+        log.info("Announcements API stopped.")
+
+    def _feed(self, request):
+        if "guild_id" not in request.match_info:
+            return self.cog.default_feed()
+        feed = self.cog.get_feed((int(request.match_info["guild_id"]), request.match_info["server_id"]))
+        if feed is None:
+            raise web.HTTPNotFound(text='{"error": "Unknown announcement feed."}', content_type="application/json")
+        return feed
+
+    async def list_feeds(self, request):
+        return web.json_response([
+            {
+                "guild_id": feed.key[0],
+                "server_id": feed.key[1],
+                "path": f"/announcements/{feed.key[0]}/{feed.key[1]}",
+                "latest_id": feed.latest_entry["id"],
+            }
+            for feed in self.cog.feeds.values()
+        ])
+
+    async def get_announcements(self, request):
+        feed = self._feed(request)
+        if "since" not in request.query and "limit" not in request.query:
+            return cached_response(request, feed.latest_payload, self.cache_control)
+
+        # Cursor pagination over the history: ?since=<last seen id>&limit=<n>
+        try:
+            limit = min(max(int(request.query.get("limit", 50)), 1), self.max_page_size)
+            since = int(request.query["since"]) if "since" in request.query else None
+        except ValueError:
+            return web.json_response({"error": "'since' and 'limit' must be integers."}, status=400)
+
+        entries = await feed.tail(limit) if since is None else await feed.since(since, limit)
+        headers = {}
+        if entries:
+            headers["X-Last-Id"] = str(entries[-1]["id"])
+            if len(entries) == limit:
+                headers["Link"] = f'<{request.path}?since={entries[-1]["id"]}&limit={limit}>; rel="next"'
+        return web.json_response(entries, headers=headers)
+
+    async def update_announcement(self, request):
+        feed = self._feed(request)
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or "message" not in data:
+            return web.json_response({"error": "Invalid request. 'message' field is required."}, status=400)
+
+        self.cog.set_announcement(
+            username=data.get("username", "System"),
+            avatar=self.cog.localize_avatar(data.get("avatar", "")),
+            message=data["message"],
+            key=feed.key,
+        )
+        return web.json_response({"success": True, "message": "Announcement updated."})
+
+    async def get_metrics(self, request):
+        """Every varis-utils metric in the Prometheus text format.
+
+        Requires the bearer token set with `[p]announcements metricstoken`. Without one nothing is
+        served: behind a reverse proxy every client looks local, so the peer address can't be trusted.
+        """
+        token = self.cog.metrics_token
+        if not token:
+            raise web.HTTPForbidden(text="Set a token with [p]announcements metricstoken to enable /metrics.")
+        expected = f"Bearer {token}".encode()
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+            raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+        return web.Response(text=metrics.render(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def get_avatar(self, request):
+        digest = request.match_info["digest"]
+        path = self.cog.avatars.resolve(digest, int(request.match_info["size"]))
+        if path is None:
+            # Evicted since it was linked: send the client to the original if it is still known
+            source = self.cog.avatars.source(digest)
+            if source:
+                raise web.HTTPFound(source)
+            raise web.HTTPNotFound()
+        return web.FileResponse(path, headers={"Cache-Control": self.avatar_cache_control})
+
+    async def stream_announcements(self, request):
+        """Push announcements to the client as Server-Sent Events."""
+        feed = self._feed(request)
+        try:
+            last_id = int(request.headers.get("Last-Event-ID") or request.query.get("last_event_id", -1))
+        except ValueError:
+            last_id = -1
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Stop nginx from buffering the stream
+        })
+        await response.prepare(request)
+
+        broadcaster = feed.broadcaster
+        # Subscribe before replaying so nothing published in between is lost
+        subscriber = broadcaster.subscribe()
+        try:
+            await response.write(b"retry: 5000\n\n")
+            if last_id < 0:
+                latest = feed.latest_entry
+                last_id = latest["id"]
+                await response.write(sse_frame(last_id, latest))
+            else:
+                for entry in await feed.since(last_id, feed.history.capacity):
+                    await response.write(sse_frame(entry["id"], entry))
+                    last_id = entry["id"]
 
-def run_api(_bot):
-    global bot
-    bot = _bot
-    app.run(host="127.0.0.1", port=8765)  # Ensure it binds to localhost only
+            while not subscriber.closed:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    await response.write(b": ping\n\n")
+                    continue
+                if item is None:
+                    break
+                event_id, frame = item
+                if event_id > last_id:
+                    await response.write(frame)
+                    last_id = event_id
+        except ConnectionResetError:
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+        return response
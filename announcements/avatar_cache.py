@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+
+log = logging.getLogger("red.announcements")
+
+# Only Discord CDN avatars are proxied, so the API can't be used to fetch arbitrary URLs
+AVATAR_HOSTS = ("cdn.discordapp.com", "media.discordapp.net")
+IMAGE_SIGNATURES = ((b"\x89PNG", "png"), (b"GIF8", "gif"), (b"RIFF", "webp"), (b"\xff\xd8\xff", "jpg"))
+
+
+def image_extension(data):
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    raise ValueError("not a supported image")
+
+
+class AvatarCache:
+    """Fetch each avatar once, resize it to a few fixed sizes and keep the results in a size-bounded LRU on disk.
+
+    Files are named after a hash of the source image, so a URL for them never changes meaning
+    and can be cached by clients indefinitely. `pinned` returns the digests that are still linked
+    to and must not be evicted.
+    """
+
+    def __init__(self, directory, sizes=(64, 128, 256), max_bytes=50 * 1024 ** 2, max_source_bytes=8 * 1024 ** 2, timeout=10,
+                 pinned=None):
+        self.directory = Path(directory)
+        self.sizes = sizes
+        self.max_bytes = max_bytes
+        self.max_source_bytes = max_source_bytes
+        self.timeout = timeout
+        self.pinned = pinned
+        self.entries = OrderedDict()  # {digest: bytes on disk}, least recently used first
+        self.total_bytes = 0
+        self._sources = OrderedDict()  # {source url: digest}
+        self._pending = {}  # {source url: fetch future}
+        self._session = None
+
+    async def open(self):
+        """Index the files already on disk, oldest first."""
+        for digest, size in await asyncio.to_thread(self._scan):
+            self.entries[digest] = self.entries.pop(digest, 0) + size
+            self.total_bytes += size
+
+    def _scan(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.directory.iterdir():
+            if path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path.name.split("_", 1)[0], stat.st_size))
+        return [(digest, size) for _, digest, size in sorted(files)]
+
+    def start(self, session):
+        """Start fetching with a (shared) session; the cache never closes it."""
+        self._session = session
+
+    async def stop(self):
+        for future in self._pending.values():
+            future.cancel()
+        self._session = None
+
+    def cached(self, url):
+        """The digest of an already cached avatar, or None."""
+        digest = self._sources.get(url)
+        if digest in self.entries:
+            self.entries.move_to_end(digest)
+            return digest
+        return None
+
+    def prefetch(self, url):
+        """Start caching the avatar at `url` in the background; returns the fetch future, or None if it isn't proxied."""
+        if self._session is None or urlsplit(url).hostname not in AVATAR_HOSTS:
+            return None
+        # Concurrent requests for the same avatar share one download
+        future = self._pending.get(url)
+        if future is None:
+            future = self._pending[url] = asyncio.ensure_future(self._fetch(url))
+            future.add_done_callback(lambda done: self._fetched(url, done))
+        return future
+
+    def _fetched(self, url, future):
+        self._pending.pop(url, None)
+        if not future.cancelled() and future.exception() is not None:
+            log.warning(f"Failed to cache avatar {url}: {future.exception()}")
+
+    async def localize(self, url):
+        """Cache the avatar at `url` and return its digest, or None if it isn't proxied or can't be fetched."""
+        digest = self.cached(url)
+        if digest is not None:
+            return digest
+        future = self.prefetch(url)
+        if future is None:
+            return None
+        try:
+            return await asyncio.shield(future)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError):
+            return None  # Logged by _fetched
+
+    async def _fetch(self, url):
+        data = bytearray()
+        async with self._session.get(url, timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                data += chunk
+                if len(data) > self.max_source_bytes:
+                    raise ValueError("avatar is too large")
+        data = bytes(data)
+
+        digest = hashlib.sha256(data).hexdigest()[:24]
+        if digest in self.entries:
+            self.entries.move_to_end(digest)
+        else:
+            written = await asyncio.to_thread(self._store, digest, data)
+            self.entries[digest] = written
+            self.total_bytes += written
+            await self._evict()
+
+        self._sources[url] = digest
+        if len(self._sources) > 4096:
+            self._sources.popitem(last=False)
+        return digest
+
+    def _write(self, name, data):
+        path = self.directory / name
+        temp = path.with_name(f"{name}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
+        return len(data)
+
+    def _store(self, digest, data):
+        extension = image_extension(data)
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            # Without Pillow every size is served from the original image
+            return self._write(f"{digest}_src.{extension}", data)
+
+        written = 0
+        try:
+            with Image.open(io.BytesIO(data)) as source:
+                image = source.convert("RGBA")  # Animated avatars use their first frame
+        except (Image.DecompressionBombError, Image.UnidentifiedImageError) as e:
+            raise ValueError(f"unusable image: {e}")
+        for size in self.sizes:
+            out = io.BytesIO()
+            ImageOps.fit(image, (size, size), Image.LANCZOS).save(out, "PNG", optimize=True)
+            written += self._write(f"{digest}_{size}.png", out.getvalue())
+        return written
+
+    async def _evict(self):
+        pinned = self.pinned() if self.pinned else ()
+        evicted = []
+        # The newest entry is always kept, whatever the budget
+        for digest in list(self.entries)[:-1]:
+            if self.total_bytes <= self.max_bytes:
+                break
+            if digest in pinned:
+                continue
+            self.total_bytes -= self.entries.pop(digest)
+            evicted.append(digest)
+        if evicted:
+            await asyncio.to_thread(self._remove, evicted)
+
+    def _remove(self, digests):
+        for digest in digests:
+            for path in self.directory.glob(f"{digest}_*"):
+                path.unlink(missing_ok=True)
+
+    def source(self, digest):
+        """The original URL of a digest fetched since the cog loaded, or None."""
+        return next((url for url, cached in self._sources.items() if cached == digest), None)
+
+    def resolve(self, digest, size):
+        """The file to serve for an avatar at a given size, or None."""
+        if digest not in self.entries or size not in self.sizes:
+            return None
+        self.entries.move_to_end(digest)
+        path = self.directory / f"{digest}_{size}.png"
+        if path.exists():
+            return path
+        return next(self.directory.glob(f"{digest}_src.*"), None)
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import logging
+
+log = logging.getLogger("red.announcements")
+
+
+def sse_frame(event_id, data, event="announcement"):
+    """Encode one Server-Sent Events frame."""
+    body = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {body}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """One streaming client with a bounded queue of pending frames."""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        # Make room for the sentinel so a waiting handler wakes up immediately
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """Fan announcement frames out to every connected stream subscriber."""
+
+    def __init__(self, queue_size=16):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.dropped = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, event_id, data):
+        # The frame is encoded once and shared by every subscriber
+        frame = sse_frame(event_id, data)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait((event_id, frame))
+            except asyncio.QueueFull:
+                # A consumer this far behind is dropped; it can resume from history with Last-Event-ID
+                self.dropped += 1
+                self.unsubscribe(subscriber)
+                subscriber.close()
+        return frame
+
+    def close(self):
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self.subscribers.clear()
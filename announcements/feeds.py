@@ -0,0 +1,56 @@
+import datetime
+
+from .broadcast import Broadcaster
+from .payload import CachedPayload
+
+DEFAULT_SERVER = "default"
+DEFAULT_ANNOUNCEMENT = {
+    "username": "Red",
+    "avatar": "https://api.hexios.top/static/avatar.png",
+    "message": "Server is offline.",
+}
+
+
+def feed_name(key):
+    """The history/storage name of a (guild_id, server_id) feed key."""
+    return f"{key[0]}/{key[1]}"
+
+
+class AnnouncementFeed:
+    """Latest announcement, cached payload and stream subscribers for one guild/server pair."""
+
+    def __init__(self, key, history):
+        self.key = key
+        self.name = feed_name(key)
+        self.history = history
+        self.broadcaster = Broadcaster()
+        latest = history.latest(self.name)
+        self.apply(latest or {"id": 0, **DEFAULT_ANNOUNCEMENT, "timestamp": datetime.datetime.now().isoformat()})
+
+    def apply(self, entry):
+        self.latest_entry = entry
+        self.latest_announcement = {key: entry[key] for key in ("username", "avatar", "message")}
+        self.updated_at = datetime.datetime.fromisoformat(entry["timestamp"])
+        # Serialize once per change; every GET reuses these bytes until the next update
+        self.latest_payload = CachedPayload([entry], self.updated_at.astimezone())
+
+    def publish(self, username, avatar, message):
+        """Record a new announcement and push it to stream subscribers."""
+        entry = self.history.append(self.name, {
+            "username": username,
+            "avatar": avatar,
+            "message": message,
+            "timestamp": datetime.datetime.now().isoformat(),
+        })
+        self.apply(entry)
+        self.broadcaster.publish(entry["id"], entry)
+        return entry
+
+    async def since(self, after_id, limit):
+        return await self.history.since(self.name, after_id, limit)
+
+    async def tail(self, limit):
+        return await self.history.tail(self.name, limit)
+
+    def close(self):
+        self.broadcaster.close()
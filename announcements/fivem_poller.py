@@ -0,0 +1,225 @@
+import asyncio
+import ipaddress
+import logging
+import re
+import socket
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from varislib import metrics
+
+log = logging.getLogger("red.announcements")
+
+# FiveM hostnames use ^0-^9 colour codes
+COLOUR_CODES = re.compile(r"\^\d")
+
+
+def _int(value, default=0):
+    """Parse a number from server JSON, which may be a string, null or garbage."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _is_public(address):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # Drop an IPv6 scope id
+    if getattr(ip, "ipv4_mapped", None):
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_endpoint(url, allow_private=False):
+    """Validate a FiveM endpoint and return it normalized to scheme://host[:port].
+
+    Raises ValueError for anything but a plain http(s) address, and, unless
+    `allow_private` is set, for hosts resolving to loopback, private, link-local
+    or otherwise non-public addresses, so the poller can't probe internal services.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        raise ValueError("That isn't a valid URL.")
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("The endpoint must be an `http://` or `https://` address.")
+    if parts.username or parts.password or parts.query or parts.fragment or parts.path.strip("/"):
+        raise ValueError("The endpoint must be just the server address, e.g. `http://1.2.3.4:30120`.")
+    normalized = f"{parts.scheme}://{parts.netloc}"
+    if allow_private:
+        return normalized
+
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except OSError as e:
+        raise ValueError(f"Couldn't resolve `{parts.hostname}`: {e}")
+    if not all(_is_public(info[4][0]) for info in infos):
+        raise ValueError(f"`{parts.hostname}` resolves to a private or local address.")
+    return normalized
+
+
+def is_private_literal(url):
+    """Whether an endpoint names a local or private address directly (no DNS lookup)."""
+    host = urlsplit(url).hostname or ""
+    if host == "localhost" or host.endswith(".localhost"):
+        return True
+    try:
+        return not _is_public(host)
+    except ValueError:
+        return False  # A hostname; checked by check_endpoint when it was set
+
+
+class FiveMPoller:
+    """Probe FiveM servers and publish their status to announcement feeds when it changes."""
+
+    def __init__(self, cog, interval=30, timeout=5, cache_ttl=10, info_ttl=300, max_backoff=600, offline_after=2):
+        self.cog = cog
+        self.interval = interval
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.info_ttl = info_ttl  # info.json rarely changes, so it is cached longer
+        self.max_backoff = max_backoff
+        self.offline_after = offline_after  # Consecutive failures before a server is reported offline
+        self.targets = {}  # {feed_key: endpoint}
+        self.state = {}  # {feed_key: last published status tuple}
+        self._cache = {}  # {url: (expires_at, data)}
+        self._failures = {}  # {endpoint: (consecutive failures, retry_at)}
+        self._session = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None
+
+    def start(self, session):
+        """Start polling with a (shared) session; the poller never closes it."""
+        if self._task is None:
+            self._session = session
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._session = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_all()
+            except Exception as e:
+                log.error(f"Error polling FiveM servers: {e}")
+            await asyncio.sleep(self.interval)
+
+    @metrics.instrument("announcements.poll_all")
+    async def poll_all(self):
+        targets = list(self.targets.items())
+        results = await asyncio.gather(*(self.poll(key, endpoint) for key, endpoint in targets), return_exceptions=True)
+        # One misbehaving server must not abort the cycle for the others
+        for (key, endpoint), result in zip(targets, results):
+            if isinstance(result, Exception):
+                log.error(f"Error polling FiveM server {endpoint} for {key}: {result}")
+
+    def set_targets(self, targets):
+        """Replace the polled endpoints, dropping cached data and backoff for removed ones."""
+        self.targets = targets
+        endpoints = {endpoint.rstrip("/") for endpoint in targets.values()}
+        self.state = {key: status for key, status in self.state.items() if key in targets}
+        self._failures = {endpoint: f for endpoint, f in self._failures.items() if endpoint.rstrip("/") in endpoints}
+        self._cache = {url: c for url, c in self._cache.items() if url.rsplit("/", 1)[0] in endpoints}
+
+    async def _get_json(self, url, ttl):
+        now = time.monotonic()
+        cached = self._cache.get(url)
+        if cached and cached[0] > now:
+            return cached[1]
+        async with self._session.get(url, timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)  # FiveM doesn't always send a JSON content type
+        self._cache[url] = (now + ttl, data)
+        return data
+
+    async def probe(self, endpoint):
+        """Fetch info.json, players.json and dynamic.json concurrently and summarize them."""
+        endpoint = endpoint.rstrip("/")
+        info, players, dynamic = await asyncio.gather(
+            self._get_json(f"{endpoint}/info.json", self.info_ttl),
+            self._get_json(f"{endpoint}/players.json", self.cache_ttl),
+            self._get_json(f"{endpoint}/dynamic.json", self.cache_ttl),
+            return_exceptions=True,
+        )
+        # info.json may be served from the long-lived cache, so only the live endpoints decide reachability
+        if isinstance(players, Exception) and isinstance(dynamic, Exception):
+            return {"online": False, "error": str(dynamic) or type(dynamic).__name__}
+
+        info = info if isinstance(info, dict) else {}
+        dynamic = dynamic if isinstance(dynamic, dict) else {}
+        if isinstance(players, list):
+            player_count = len(players)
+        else:
+            player_count = _int(dynamic.get("clients"))
+        server_vars = info.get("vars") if isinstance(info.get("vars"), dict) else {}
+        max_players = dynamic.get("sv_maxclients") or server_vars.get("sv_maxClients", 0)
+        hostname = COLOUR_CODES.sub("", str(dynamic.get("hostname") or server_vars.get("sv_projectName", "")))
+        return {
+            "online": True,
+            "players": player_count,
+            "max_players": _int(max_players),
+            "hostname": hostname.strip(),
+        }
+
+    async def poll(self, key, endpoint):
+        now = time.monotonic()
+        failures, retry_at = self._failures.get(endpoint, (0, 0))
+        if now < retry_at:
+            return
+
+        status = await self.probe(endpoint)
+        if status["online"]:
+            self._failures.pop(endpoint, None)
+        else:
+            failures += 1
+            # Exponential backoff keeps dead servers from being hammered every interval
+            delay = min(self.max_backoff, self.interval * 2 ** (failures - 1))
+            self._failures[endpoint] = (failures, now + delay)
+            log.warning(f"FiveM server {endpoint} unreachable ({failures}x), retrying in {delay}s: {status['error']}")
+            if failures < self.offline_after:
+                return
+        self.publish_if_changed(key, status)
+
+    def export(self):
+        """Last published statuses and failure counts, for snapshots."""
+        return {
+            "state": dict(self.state),
+            "failures": {endpoint: failures for endpoint, (failures, _) in self._failures.items()},
+        }
+
+    def restore(self, snapshot):
+        """Resume from a snapshot so unchanged statuses aren't re-announced after a restart."""
+        self.state.update({key: tuple(status) for key, status in snapshot.get("state", {}).items() if key in self.targets})
+        endpoints = set(self.targets.values())
+        for endpoint, failures in snapshot.get("failures", {}).items():
+            if endpoint in endpoints:
+                self._failures[endpoint] = (failures, 0)  # Retry right away, but keep the backoff level
+
+    def publish_if_changed(self, key, status):
+        summary = (status["online"], status.get("players"), status.get("max_players"))
+        if self.state.get(key) == summary:
+            return False
+        self.state[key] = summary
+
+        if status["online"]:
+            message = f"🟢 Online: {status['players']}/{status['max_players']} players"
+        else:
+            message = "🔴 Server is offline."
+        self.cog.set_announcement(
+            username=status.get("hostname") or "Server Monitor",
+            avatar="",
+            message=message,
+            key=key,
+        )
+        return True
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from collections import deque
+
+log = logging.getLogger("red.announcements")
+
+# Feed that rows written before per-feed history existed are assigned to
+LEGACY_FEED = "0/default"
+
+
+class AnnouncementHistory:
+    """Append-only announcement log: SQLite on disk, a ring buffer per feed for hot reads."""
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.recent = {}  # {feed: deque of entries}
+        self.last_id = 0  # Ids are global, so they also increase monotonically within each feed
+        self._db = None
+        self._lock = asyncio.Lock()  # Serializes all access to the SQLite connection
+        self._pending = set()
+
+    async def open(self, path):
+        """Open (or create) the database and load the newest entries of every feed into memory."""
+        async with self._lock:
+            self._db = await asyncio.to_thread(self._connect, path)
+            rows = await asyncio.to_thread(self._load_recent)
+        for feed, entry in rows:
+            self._ring(feed).append(entry)
+            self.last_id = max(self.last_id, entry["id"])
+
+    async def close(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        async with self._lock:
+            if self._db is not None:
+                await asyncio.to_thread(self._db.close)
+                self._db = None
+
+    @staticmethod
+    def _connect(path):
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS announcements (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        columns = {row[1] for row in db.execute("PRAGMA table_info(announcements)")}
+        if "feed" not in columns:
+            db.execute(f"ALTER TABLE announcements ADD COLUMN feed TEXT NOT NULL DEFAULT '{LEGACY_FEED}'")
+        db.execute("CREATE INDEX IF NOT EXISTS announcements_feed_id ON announcements (feed, id)")
+        db.commit()
+        return db
+
+    def _load_recent(self):
+        query = (
+            "SELECT feed, id, data FROM ("
+            "SELECT feed, id, data, ROW_NUMBER() OVER (PARTITION BY feed ORDER BY id DESC) AS n FROM announcements"
+            ") WHERE n <= ? ORDER BY id"
+        )
+        return [(row[0], {"id": row[1], **json.loads(row[2])}) for row in self._db.execute(query, (self.capacity,))]
+
+    def _fetch(self, query, params):
+        return [{"id": row[0], **json.loads(row[1])} for row in self._db.execute(query, params)]
+
+    def _ring(self, feed):
+        ring = self.recent.get(feed)
+        if ring is None:
+            ring = self.recent[feed] = deque(maxlen=self.capacity)
+        return ring
+
+    def feeds(self):
+        return list(self.recent)
+
+    def latest(self, feed):
+        ring = self.recent.get(feed)
+        return ring[-1] if ring else None
+
+    def append(self, feed, entry):
+        """Assign the next id, keep the entry in memory and persist it in the background."""
+        self.last_id += 1
+        entry = {"id": self.last_id, **entry}
+        self._ring(feed).append(entry)
+        task = asyncio.create_task(self._persist(feed, entry))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return entry
+
+    async def _persist(self, feed, entry):
+        data = json.dumps({k: v for k, v in entry.items() if k != "id"}, separators=(",", ":"))
+        async with self._lock:
+            if self._db is None:
+                return
+            try:
+                await asyncio.to_thread(self._insert, feed, entry["id"], data)
+            except sqlite3.Error as e:
+                log.error(f"Failed to persist announcement {entry['id']} for feed {feed}: {e}")
+
+    def _insert(self, feed, entry_id, data):
+        self._db.execute("INSERT INTO announcements (id, feed, data) VALUES (?, ?, ?)", (entry_id, feed, data))
+        self._db.commit()
+
+    async def since(self, feed, after_id, limit):
+        """Up to `limit` entries of a feed with an id greater than `after_id`, oldest first."""
+        ring = self.recent.get(feed, ())
+        # Ids are global, so the ring only covers the cursor if nothing older than it was evicted
+        if self._db is None or (ring and (len(ring) < self.capacity or after_id >= ring[0]["id"])):
+            return [entry for entry in ring if entry["id"] > after_id][:limit]
+        return await self._query(
+            "SELECT id, data FROM announcements WHERE feed = ? AND id > ? ORDER BY id LIMIT ?", (feed, after_id, limit)
+        )
+
+    async def tail(self, feed, limit):
+        """The newest `limit` entries of a feed, oldest first."""
+        ring = self.recent.get(feed, ())
+        if self._db is None or limit <= len(ring) or len(ring) < self.capacity:
+            return list(ring)[-limit:]
+        rows = await self._query(
+            "SELECT id, data FROM announcements WHERE feed = ? ORDER BY id DESC LIMIT ?", (feed, limit)
+        )
+        return rows[::-1]
+
+    async def _query(self, query, params):
+        async with self._lock:
+            if self._db is None:
+                return []
+            return await asyncio.to_thread(self._fetch, query, params)
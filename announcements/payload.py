@@ -0,0 +1,25 @@
+import datetime
+import email.utils
+import gzip
+import hashlib
+import json
+
+
+class CachedPayload:
+    """A JSON response body serialized once, with cache validators and a gzip variant."""
+
+    def __init__(self, data, modified=None):
+        self.body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        digest = hashlib.blake2b(self.body, digest_size=12).hexdigest()
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+        modified = modified or datetime.datetime.now(datetime.timezone.utc)
+        # HTTP dates have one-second resolution; truncate so If-Modified-Since compares cleanly
+        self.last_modified = modified.astimezone(datetime.timezone.utc).replace(microsecond=0)
+        self.last_modified_header = email.utils.format_datetime(self.last_modified, usegmt=True)
+
+    def matches(self, if_none_match):
+        """Whether an If-None-Match header value matches either representation."""
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
@@ -0,0 +1 @@
+"""Benchmarks for the varis-utils cogs. See each module for usage."""
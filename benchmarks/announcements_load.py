@@ -0,0 +1,251 @@
+"""Load test for the announcements HTTP API.
+
+Starts the API with a fake bot and an in-memory Config in a separate process,
+then drives a mix of pollers (GET /announcements), writers
+(POST /announcements/update) and SSE subscribers (GET /announcements/stream)
+against it. Reports requests/second, p50/p95/p99 latency, error rate, SSE
+delivery lag and the server process's CPU and RSS, and saves the results to
+benchmarks/results/ so runs can be compared over time.
+
+Run from the repository root (Red-DiscordBot and psutil must be installed)::
+
+    python -m benchmarks.announcements_load
+    python -m benchmarks.announcements_load --readers 500 --streamers 1000 --duration 30
+    python -m benchmarks.announcements_load --conditional --compare benchmarks/results/<old>.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+import psutil
+
+from benchmarks.fakes import FakeBot, FakeConfig
+
+RESULTS = Path(__file__).parent / "results"
+
+
+async def serve(port, data_dir):
+    """Run the API in this process until killed (used by the load generator's subprocess)."""
+    import announcements.announcements as module
+
+    module.Config = FakeConfig
+    module.cog_data_path = lambda cog: Path(data_dir)
+    cog = module.Announcements(FakeBot())
+    await cog.config.api_port.set(port)
+    await cog.cog_load()
+    print("READY", flush=True)
+    await asyncio.Event().wait()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    def summary(self, duration):
+        latencies = sorted(self.latencies)
+        total = len(latencies) + self.errors
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else None
+
+        return {
+            "requests": total,
+            "rps": total / duration,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "error_rate": self.errors / total if total else 0.0,
+        }
+
+
+async def reader(session, url, stats, conditional, stop):
+    etag = None
+    while not stop.is_set():
+        headers = {"If-None-Match": etag} if conditional and etag else {}
+        started = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers) as resp:
+                await resp.read()
+                if resp.status not in (200, 304):
+                    stats.errors += 1
+                    continue
+                etag = resp.headers.get("ETag", etag)
+            stats.latencies.append(time.perf_counter() - started)
+        except aiohttp.ClientError:
+            stats.errors += 1
+
+
+async def writer(session, url, stats, rate, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            async with session.post(url, json={"username": "load", "message": f"sent={time.time()}"}) as resp:
+                await resp.read()
+                if resp.status != 200:
+                    stats.errors += 1
+                else:
+                    stats.latencies.append(time.perf_counter() - started)
+        except aiohttp.ClientError:
+            stats.errors += 1
+        await asyncio.sleep(1 / rate)
+
+
+async def streamer(session, url, lags, counts, stop):
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=None)) as resp:
+            async for line in resp.content:
+                if stop.is_set():
+                    break
+                if line.startswith(b"data:"):
+                    counts[0] += 1
+                    message = json.loads(line[5:]).get("message", "")
+                    if message.startswith("sent="):
+                        lags.append(time.time() - float(message[5:]))
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        counts[1] += 1
+
+
+async def sample_server(proc, samples, stop):
+    proc.cpu_percent(None)
+    while not stop.is_set():
+        await asyncio.sleep(0.5)
+        samples.append((proc.cpu_percent(None), proc.memory_info().rss))
+
+
+async def run_load(args, port, server):
+    base = f"http://127.0.0.1:{port}/announcements"
+    stop = asyncio.Event()
+    read_stats, write_stats = Stats(), Stats()
+    lags, stream_counts, server_samples = [], [0, 0], []
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [asyncio.create_task(sample_server(server, server_samples, stop))]
+        tasks += [asyncio.create_task(streamer(session, f"{base}/stream", lags, stream_counts, stop)) for _ in range(args.streamers)]
+        await asyncio.sleep(0.5)  # Let the streams connect before traffic starts
+        tasks += [asyncio.create_task(reader(session, base, read_stats, args.conditional, stop)) for _ in range(args.readers)]
+        tasks += [asyncio.create_task(writer(session, f"{base}/update", write_stats, args.write_rate, stop)) for _ in range(args.writers)]
+
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        duration = time.perf_counter() - started
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    lags.sort()
+    cpu = [sample[0] for sample in server_samples] or [0.0]
+    rss = [sample[1] for sample in server_samples] or [0]
+    return {
+        "reads": read_stats.summary(duration),
+        "writes": write_stats.summary(duration),
+        "streams": {
+            "subscribers": args.streamers,
+            "events_received": stream_counts[0],
+            "disconnects": stream_counts[1],
+            "lag_p50_ms": lags[len(lags) // 2] * 1000 if lags else None,
+            "lag_p99_ms": lags[min(len(lags) - 1, int(0.99 * len(lags)))] * 1000 if lags else None,
+        },
+        "server": {
+            "cpu_avg_percent": sum(cpu) / len(cpu),
+            "cpu_max_percent": max(cpu),
+            "rss_max_mib": max(rss) / 1024 ** 2,
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def fmt(value, spec=".1f"):
+    return "-" if value is None else format(value, spec)
+
+
+def report(results, previous=None):
+    for kind in ("reads", "writes"):
+        r = results[kind]
+        line = (
+            f"{kind:<7} {r['rps']:>9.0f} req/s  p50 {fmt(r['p50_ms'], '.2f')} ms  p95 {fmt(r['p95_ms'], '.2f')} ms  "
+            f"p99 {fmt(r['p99_ms'], '.2f')} ms  errors {r['error_rate']:.2%}"
+        )
+        if previous and previous.get(kind, {}).get("rps"):
+            line += f"  ({(r['rps'] - previous[kind]['rps']) / previous[kind]['rps']:+.1%} rps)"
+        print(line)
+    s = results["streams"]
+    print(
+        f"streams {s['subscribers']} subscribers, {s['events_received']} events, {s['disconnects']} disconnects, "
+        f"lag p50 {fmt(s['lag_p50_ms'], '.2f')} ms p99 {fmt(s['lag_p99_ms'], '.2f')} ms"
+    )
+    srv = results["server"]
+    print(f"server  cpu avg {srv['cpu_avg_percent']:.0f}% max {srv['cpu_max_percent']:.0f}%, rss max {srv['rss_max_mib']:.1f} MiB")
+
+
+async def main(args):
+    if args.serve:
+        await serve(args.port, args.data_dir)
+        return
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as data_dir:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.announcements_load", "--serve", "--port", str(port), "--data-dir", data_dir],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            if process.stdout.readline().strip() != "READY":
+                raise RuntimeError("Announcements API failed to start")
+            results = await run_load(args, port, psutil.Process(process.pid))
+        finally:
+            process.terminate()
+            process.wait()
+
+    results["config"] = {k: v for k, v in vars(args).items() if k not in ("serve", "port", "data_dir", "compare")}
+    results["revision"] = git_revision()
+    results["timestamp"] = datetime.datetime.now().isoformat(timespec="seconds")
+
+    previous = json.loads(Path(args.compare).read_text()) if args.compare else None
+    report(results, previous)
+    RESULTS.mkdir(exist_ok=True)
+    path = RESULTS / f"announcements-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=200, help="Concurrent GET /announcements pollers")
+    parser.add_argument("--writers", type=int, default=2, help="Concurrent POST /announcements/update clients")
+    parser.add_argument("--write-rate", type=float, default=2, help="Updates per second per writer")
+    parser.add_argument("--streamers", type=int, default=200, help="Concurrent SSE subscribers")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds of load")
+    parser.add_argument("--conditional", action="store_true", help="Pollers revalidate with If-None-Match")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
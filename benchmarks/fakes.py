@@ -0,0 +1,154 @@
+"""In-memory stand-ins for Red's Config and discord objects used by the benchmarks."""
+import copy
+from types import SimpleNamespace
+
+
+class FakeGroup:
+    """Dict-backed replacement for a Red Config group."""
+
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+
+    def _data(self):
+        return self._store.setdefault(self._key, {})
+
+    async def all(self):
+        # Red hands out copies of stored data; do the same so costs are comparable
+        return copy.deepcopy(self._data())
+
+    async def set(self, value):
+        self._store[self._key] = copy.deepcopy(value)
+
+    async def clear(self):
+        self._store[self._key] = {}
+
+    async def get_raw(self, *keys, default=None):
+        data = self._data()
+        for key in keys:
+            if not isinstance(data, dict) or key not in data:
+                return default
+            data = data[key]
+        return copy.deepcopy(data)
+
+    async def set_raw(self, *keys, value):
+        data = self._data()
+        for key in keys[:-1]:
+            data = data.setdefault(key, {})
+        data[keys[-1]] = copy.deepcopy(value)
+
+    async def clear_raw(self, *keys):
+        data = self._data()
+        for key in keys[:-1]:
+            data = data.get(key, {})
+        data.pop(keys[-1], None)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FakeValue(self._data(), name)
+
+
+class FakeValue:
+    """Attribute-style access to one key of a FakeGroup, e.g. `group.enabled()`."""
+
+    def __init__(self, data, name):
+        self._data = data
+        self._name = name
+
+    async def _get(self):
+        return copy.deepcopy(self._data.get(self._name))
+
+    def __await__(self):
+        return self._get().__await__()
+
+    def __call__(self):
+        return self._get()
+
+    async def set(self, value):
+        self._data[self._name] = copy.deepcopy(value)
+
+    async def clear(self):
+        self._data.pop(self._name, None)
+
+
+class FakeConfig:
+    """Minimal in-memory implementation of the Config API the cogs use."""
+
+    def __init__(self):
+        self._custom = {}
+        self._guilds = {}
+        self._global = {}
+        self._guild_defaults = {}
+
+    @classmethod
+    def get_conf(cls, cog_instance, identifier, force_registration=False):
+        return cls()
+
+    def register_custom(self, group_identifier, default=None, **kwargs):
+        self._custom.setdefault(group_identifier, copy.deepcopy(default if default is not None else kwargs))
+
+    def register_guild(self, **defaults):
+        self._guild_defaults.update(defaults)
+
+    def register_global(self, **defaults):
+        for key, value in defaults.items():
+            self._global.setdefault(key, copy.deepcopy(value))
+
+    def custom(self, group_identifier, *identifiers):
+        return FakeGroup(self._custom, group_identifier)
+
+    def guild(self, guild):
+        if guild.id not in self._guilds:
+            self._guilds[guild.id] = copy.deepcopy(self._guild_defaults)
+        return FakeGroup(self._guilds, guild.id)
+
+    async def all_guilds(self):
+        return copy.deepcopy(self._guilds)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FakeValue(self._global, name)
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+def make_member(user_id, admin=False, role_ids=()):
+    return SimpleNamespace(
+        id=user_id,
+        bot=False,
+        display_name=f"user{user_id}",
+        guild_permissions=SimpleNamespace(administrator=admin),
+        roles=[SimpleNamespace(id=role_id) for role_id in role_ids],
+        avatar=None,
+    )
+
+
+def make_message(content, author, guild, channel):
+    return SimpleNamespace(content=content, author=author, guild=guild, channel=channel)
+
+
+class FakeBot:
+    def __init__(self, guilds=()):
+        self.guilds = list(guilds)
+        self._cogs = {}
+
+    def get_guild(self, guild_id):
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_cog(self, name):
+        return self._cogs.get(name)
+
+    async def add_cog(self, cog):
+        self._cogs[type(cog).__name__] = cog
+
+    async def remove_cog(self, name):
+        return self._cogs.pop(name, None)
@@ -0,0 +1,98 @@
+"""Import-time and memory benchmark for each cog.
+
+Imports every cog package in a fresh interpreter that has already loaded what a
+running bot always has (discord.py, Red and aiohttp), then reports how long the
+import took, how much resident memory it added and which optional heavyweight
+dependencies it pulled in. Those should only be loaded when the feature that
+needs them is first used.
+
+Run from the repository root (Red-DiscordBot must be installed)::
+
+    python -m benchmarks.import_cost
+    python -m benchmarks.import_cost --repeat 10 --save-baseline
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASELINE = Path(__file__).parent / "baselines" / "import_cost.json"
+PACKAGES = ("varislib", "announcements", "naturalassistant", "nwsshutdown")
+# Optional dependencies that must stay off the import path
+HEAVY = ("openai", "psutil", "bs4", "numpy", "PIL", "flask")
+
+PROBE = """
+import importlib, json, resource, sys, time
+
+def rss_kib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform == "darwin" else peak
+
+import aiohttp, discord, redbot.core, redbot.core.commands  # Already loaded in a running bot
+before = rss_kib()
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "rss_kib": rss_kib() - before,
+    "heavy": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def measure(package):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, package, json.dumps(HEAVY)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def run(package, repeat):
+    samples = [measure(package) for _ in range(repeat)]
+    return {
+        "import_ms": statistics.median(sample["import_ms"] for sample in samples),
+        "rss_mib": statistics.median(sample["rss_kib"] for sample in samples) / 1024,
+        "heavy": samples[0]["heavy"],
+    }
+
+
+def compare(current, baseline):
+    if not baseline:
+        return ""
+    delta = current["import_ms"] - baseline["import_ms"]
+    return f"{delta:+7.1f} ms vs baseline"
+
+
+def main(args):
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    results = {}
+    print(f"{'package':<18} {'import ms':>10} {'rss MiB':>8}  heavy imports")
+    for package in args.packages:
+        result = results[package] = run(package, args.repeat)
+        print(
+            f"{package:<18} {result['import_ms']:>10.1f} {result['rss_mib']:>8.1f}  "
+            f"{', '.join(result['heavy']) or '-':<20} {compare(result, baseline.get(package))}"
+        )
+
+    if args.save_baseline:
+        BASELINE.parent.mkdir(exist_ok=True)
+        BASELINE.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True))
+        print(f"Baseline written to {BASELINE}")
+    # Non-zero exit lets CI catch an optional dependency creeping back onto the import path
+    return 1 if any(result["heavy"] for result in results.values()) else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", nargs="+", default=list(PACKAGES))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per package; the median is reported")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE.name}")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,117 @@
+"""Mock FiveM server exposing info.json, players.json and dynamic.json.
+
+Used to exercise the announcements FiveM poller locally::
+
+    python -m benchmarks.mock_fivem --port 30120 --players 12 --max-players 64
+    python -m benchmarks.mock_fivem --churn 5 --downtime 30   # players change, server drops out
+
+Then point a server at it with ``[p]announcements setendpoint <server> http://127.0.0.1:30120``.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+
+class MockFiveMServer:
+    """Serves FiveM-style status endpoints with configurable player churn and outages."""
+
+    def __init__(self, players=10, max_players=48, hostname="^1Mock ^7FiveM", churn=0.0, latency=0.0):
+        self.players = players
+        self.max_players = max_players
+        self.hostname = hostname
+        self.churn = churn  # Probability per request that the player count changes
+        self.latency = latency  # Seconds added to every response
+        self.online = True
+        self.requests = 0
+        self._runner = None
+
+    def build_app(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes([
+            web.get("/info.json", self.info),
+            web.get("/players.json", self.players_json),
+            web.get("/dynamic.json", self.dynamic),
+        ])
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests += 1
+        if not self.online:
+            raise web.HTTPServiceUnavailable()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.churn and random.random() < self.churn:
+            self.players = max(0, min(self.max_players, self.players + random.choice((-1, 1))))
+        return await handler(request)
+
+    async def info(self, request):
+        return web.json_response({
+            "server": "FXServer-master SERVER v1.0.0.0 linux",
+            "vars": {"sv_maxClients": str(self.max_players), "sv_projectName": self.hostname},
+            "resources": ["mapmanager", "chat", "spawnmanager"],
+            "version": 0,
+        })
+
+    async def players_json(self, request):
+        return web.json_response([
+            {"id": i + 1, "name": f"player{i + 1}", "ping": random.randint(20, 120), "identifiers": []}
+            for i in range(self.players)
+        ])
+
+    async def dynamic(self, request):
+        # Real servers return text/plain here
+        return web.json_response({
+            "clients": self.players,
+            "gametype": "Freeroam",
+            "hostname": self.hostname,
+            "mapname": "fivem-map-skater",
+            "sv_maxclients": str(self.max_players),
+        }, content_type="text/plain")
+
+    async def start(self, host="127.0.0.1", port=30120):
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def main(args):
+    server = MockFiveMServer(args.players, args.max_players, churn=args.churn / 100, latency=args.latency / 1000)
+    await server.start(args.host, args.port)
+    print(f"Mock FiveM server on http://{args.host}:{args.port} ({args.players}/{args.max_players} players)")
+    started = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(1)
+            if args.downtime:
+                # Alternate between online and offline periods of `downtime` seconds
+                online = int((time.monotonic() - started) // args.downtime) % 2 == 0
+                if online != server.online:
+                    server.online = online
+                    print(f"Server is now {'online' if online else 'offline'} ({server.requests} requests so far)")
+    finally:
+        await server.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=30120)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--max-players", type=int, default=48)
+    parser.add_argument("--churn", type=float, default=0, help="Percent chance per request that the player count changes")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds of delay added to each response")
+    parser.add_argument("--downtime", type=int, default=0, help="Toggle the server offline every N seconds")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,211 @@
+"""Throughput benchmark for NaturalAssistant.on_message.
+
+Drives synthetic message streams through the listener with an in-memory Config,
+fake discord objects and stubbed GPT/Pterodactyl backends, then reports
+messages/second, p50/p99 latency, memory blocks allocated per message and the
+mean peak of memory held while handling one message. Runs are compared with the
+stored baseline; a throughput, p99 or allocation regression makes the run exit 1.
+
+Run from the repository root (Red-DiscordBot must be installed)::
+
+    python -m benchmarks.on_message
+    python -m benchmarks.on_message --intents 10 5000 --users 50 --mix chatter
+    python -m benchmarks.on_message --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks.fakes import FakeBot, FakeChannel, FakeConfig, make_member, make_message
+
+BASELINE = Path(__file__).parent / "baselines" / "on_message.json"
+# Allowed change vs the baseline before a metric counts as a regression
+TOLERANCE = {"msgs_per_sec": -0.10, "p99_us": 0.20, "alloc_blocks_per_msg": 0.10}
+
+# Share of (intent, fallback, noise) messages in each traffic mix
+MIXES = {
+    "commands": (0.7, 0.2, 0.1),
+    "chatter": (0.1, 0.6, 0.3),
+    "mixed": (0.4, 0.3, 0.3),
+}
+GREETINGS = ["hi", "hello!", "hey how are you", "restart the server please", "check status?", "Hello there"]
+WORDS = "the quick brown fox jumps over lazy dog server game player map mod lag ping".split()
+
+
+class FakePterodactyl:
+    async def handle_action(self, action, server_id):
+        await asyncio.sleep(0)
+        return f"Server {action} command sent successfully."
+
+
+async def fake_gpt(result):
+    # Intent prediction gets an unparseable answer so match_intent falls through
+    # to the fallback phrases, exactly like a GPT outage would.
+    return "None" if result.startswith("Predict the intent") else result
+
+
+def load_cog():
+    import naturalassistant.core as core
+    import naturalassistant.intent_handler as intent_handler
+
+    core.Config = FakeConfig
+    core.format_response_with_gpt = fake_gpt
+    intent_handler.format_response_with_gpt = fake_gpt
+    return core.NaturalAssistant
+
+
+async def build(intent_count, user_count, rate_limited, seed):
+    cog_cls = load_cog()
+    guild = SimpleNamespace(id=1, name="Bench")
+    bot = FakeBot([guild])
+    cog = cog_cls(bot)
+    cog.ptero_api = cog.power_queue.ptero_api = FakePterodactyl()
+
+    await cog.config.custom("features").set({"resource_monitoring": False, "intent_handling": True})
+    if not rate_limited:
+        await cog.config.custom("rate_limit").set({"max_requests": 10 ** 9, "time_window": 1})
+    rng = random.Random(seed)
+    intents = {
+        f"do thing {i}": {
+            "action": rng.choice(["start", "stop", "restart", "status"]),
+            "server_id": f"srv{i % 20:05d}",
+            "roles": [100 + i % 5],
+        }
+        for i in range(intent_count)
+    }
+    await cog.config.custom("intents").set(intents)
+    await cog.config_manager.load()
+    await cog.rebuild_fallback_index()
+
+    users = [make_member(i, admin=i % 10 == 0, role_ids=[100 + i % 7]) for i in range(user_count)]
+    channels = [FakeChannel(1000 + i) for i in range(8)]
+    return cog, guild, users, channels, list(intents)
+
+
+def make_stream(count, mix, phrases, users, guild, channels, seed):
+    rng = random.Random(seed)
+    intent_share, fallback_share, _ = MIXES[mix]
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < intent_share and phrases:
+            content = f"please {rng.choice(phrases)} now"
+        elif roll < intent_share + fallback_share:
+            content = rng.choice(GREETINGS)
+        else:
+            content = " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+        messages.append(make_message(content, rng.choice(users), guild, rng.choice(channels)))
+    return messages
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+
+async def run_scenario(intent_count, user_count, mix, messages, rate_limited, seed=1234):
+    cog, guild, users, channels, phrases = await build(intent_count, user_count, rate_limited, seed)
+    stream = make_stream(messages, mix, phrases, users, guild, channels, seed)
+
+    for message in stream[: min(200, len(stream))]:  # Warm up
+        await cog.on_message(message)
+
+    latencies = []
+    started = time.perf_counter()
+    for message in stream:
+        t0 = time.perf_counter()
+        await cog.on_message(message)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    # Memory pass is separate so tracemalloc overhead doesn't skew the timings
+    sample = stream[: min(500, len(stream))]
+    tracemalloc.start()
+    start_snapshot = tracemalloc.take_snapshot()
+    peak = 0
+    for message in sample:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await cog.on_message(message)
+        peak += tracemalloc.get_traced_memory()[1] - before
+    # Blocks allocated over the loop and still alive at the end, i.e. what each message leaves behind
+    blocks = sum(stat.count_diff for stat in tracemalloc.take_snapshot().compare_to(start_snapshot, "traceback"))
+    tracemalloc.stop()
+    cog.power_queue.close()
+
+    latencies.sort()
+    return {
+        "msgs_per_sec": len(stream) / elapsed,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "alloc_blocks_per_msg": max(blocks, 0) / len(sample),
+        "peak_kib_per_msg": peak / len(sample) / 1024,
+    }
+
+
+def scenario_key(intent_count, user_count, mix, rate_limited):
+    return f"intents={intent_count} users={user_count} mix={mix}" + (" rate_limited" if rate_limited else "")
+
+
+def compare(current, baseline):
+    """Describe the change vs the baseline; returns (text, regressed metrics)."""
+    if not baseline:
+        return "", []
+    parts, regressed = [], []
+    for metric, tolerance in TOLERANCE.items():
+        if metric not in baseline:
+            continue  # Baseline saved before the metric existed
+        old, new = baseline[metric], current[metric]
+        change = (new - old) / old if old else (1.0 if new > old else 0.0)
+        parts.append(f"{metric.split('_')[0]} {change * 100:+.1f}%")
+        if (change < tolerance) if tolerance < 0 else (change > tolerance):
+            regressed.append(metric)
+    return ", ".join(parts) + (f"  REGRESSION: {', '.join(regressed)}" if regressed else ""), regressed
+
+
+async def main(args):
+    # Cooldown skips are logged as warnings on every message; keep errors only
+    logging.getLogger("red.naturalassistant").setLevel(logging.ERROR)
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    results = {}
+    regressions = 0
+    print(f"{'scenario':<48} {'msg/s':>10} {'p50 us':>9} {'p99 us':>9} {'blocks':>7} {'peak KiB':>8}")
+    for intent_count in args.intents:
+        for user_count in args.users:
+            for mix in args.mix:
+                key = scenario_key(intent_count, user_count, mix, args.rate_limited)
+                result = await run_scenario(intent_count, user_count, mix, args.messages, args.rate_limited)
+                results[key] = result
+                text, regressed = compare(result, baseline.get(key))
+                regressions += bool(regressed)
+                print(
+                    f"{key:<48} {result['msgs_per_sec']:>10.0f} {result['p50_us']:>9.1f} {result['p99_us']:>9.1f} "
+                    f"{result['alloc_blocks_per_msg']:>7.1f} {result['peak_kib_per_msg']:>8.1f} {text}"
+                )
+
+    if args.save_baseline:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True))
+        print(f"Baseline saved to {BASELINE}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--intents", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--mix", choices=sorted(MIXES), nargs="+", default=["commands", "chatter"])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rate-limited", action="store_true", help="Keep the default 5 requests/60s rate limit")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE.name}")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
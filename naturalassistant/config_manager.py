@@ -1,43 +1,120 @@
+DEFAULT_FEATURES = {"resource_monitoring": False, "intent_handling": False}
+DEFAULT_RATE_LIMIT = {"max_requests": 5, "time_window": 60}
+
+
+def _copy_intent(intent):
+    return {**intent, "roles": list(intent.get("roles", []))}
+
+
 class ConfigManager:
     def __init__(self, config):
         self.config = config
+        # Write-through mirrors of the "intents", "api_keys", "features" and "rate_limit"
+        # groups. Every reader uses these, so per-message lookups never touch Config.
+        self._intents = None
+        self._api_keys = None
+        self._features = None
+        self._rate_limit = None
+
+    async def load(self):
+        """Read intents and API keys from Config into the in-memory mirror."""
+        intents = await self.config.custom("intents").all() or {}
+        self._intents = {
+            phrase: intent for phrase, intent in intents.items() if isinstance(intent, dict) and "action" in intent
+        }
+        api_keys = await self.config.custom("api_keys").all() or {}
+        self._api_keys = {"ptero": api_keys.get("ptero"), "gpt": api_keys.get("gpt")}  # Ensure default structure
+        try:
+            features = await self.config.custom("features").all()
+        except ValueError:
+            # Initialize the features group if it is not already initialized
+            features = dict(DEFAULT_FEATURES)
+            await self.config.custom("features").set(features)
+        self._features = {**DEFAULT_FEATURES, **(features or {})}
+        rate_limit = await self.config.custom("rate_limit").all()
+        self._rate_limit = {**DEFAULT_RATE_LIMIT, **(rate_limit or {})}
+
+    async def _ensure_loaded(self):
+        if self._intents is None or self._api_keys is None or self._features is None or self._rate_limit is None:
+            await self.load()
 
     async def add_intent(self, phrase, action, server_id, roles):
-        intents = await self.config.custom("intents").all()
-        intents[phrase] = {"action": action, "server_id": server_id, "roles": roles}
-        await self.config.custom("intents").set(intents)
+        await self._ensure_loaded()
+        intent = {"action": action, "server_id": server_id, "roles": roles}
+        await self.config.custom("intents").set_raw(phrase, value=intent)
+        self._intents[phrase] = intent
 
     async def remove_intent(self, phrase):
-        intents = await self.config.custom("intents").all()
-        intents.pop(phrase, None)
-        await self.config.custom("intents").set(intents)
+        await self._ensure_loaded()
+        if phrase in self._intents:
+            await self.config.custom("intents").clear_raw(phrase)
+            del self._intents[phrase]
 
     async def list_intents(self):
-        intents = await self.config.custom("intents").all()
-        return intents or {}
+        await self._ensure_loaded()
+        return {phrase: _copy_intent(intent) for phrase, intent in self._intents.items()}
+
+    async def find_intent(self, message):
+        """The first intent whose phrase appears in `message`, or None."""
+        await self._ensure_loaded()
+        message = message.lower()
+        for phrase, intent in self._intents.items():
+            if phrase.lower() in message:
+                return _copy_intent(intent)
+        return None
+
+    async def import_intents(self, intents, replace=False):
+        """Bulk-load intents with a single write; returns the number imported."""
+        await self._ensure_loaded()
+        imported = {
+            phrase: {
+                "action": intent["action"],
+                "server_id": intent.get("server_id"),
+                "roles": list(intent.get("roles", [])),
+            }
+            for phrase, intent in intents.items()
+        }
+        merged = imported if replace else {**self._intents, **imported}
+        await self.config.custom("intents").set(merged)
+        self._intents = merged
+        return len(imported)
+
+    async def export_intents(self):
+        return await self.list_intents()
 
     async def set_ptero_api_key(self, api_key):
-        api_keys = await self.config.custom("api_keys").all()
-        if not api_keys:
-            api_keys = {"ptero": None, "gpt": None}  # Ensure default structure
-        api_keys["ptero"] = api_key
-        await self.config.custom("api_keys").set(api_keys)
+        await self._ensure_loaded()
+        await self.config.custom("api_keys").set_raw("ptero", value=api_key)
+        self._api_keys["ptero"] = api_key
 
     async def get_ptero_api_key(self):
-        api_keys = await self.config.custom("api_keys").all()
-        if not api_keys:
-            api_keys = {"ptero": None, "gpt": None}  # Ensure default structure
-        return api_keys.get("ptero", None)
+        await self._ensure_loaded()
+        return self._api_keys.get("ptero", None)
 
     async def set_gpt_api_key(self, api_key):
-        api_keys = await self.config.custom("api_keys").all()
-        if not api_keys:
-            api_keys = {"ptero": None, "gpt": None}  # Ensure default structure
-        api_keys["gpt"] = api_key
-        await self.config.custom("api_keys").set(api_keys)
+        await self._ensure_loaded()
+        await self.config.custom("api_keys").set_raw("gpt", value=api_key)
+        self._api_keys["gpt"] = api_key
 
     async def get_gpt_api_key(self):
-        api_keys = await self.config.custom("api_keys").all()
-        if not api_keys:
-            api_keys = {"ptero": None, "gpt": None}  # Ensure default structure
-        return api_keys.get("gpt", None)
+        await self._ensure_loaded()
+        return self._api_keys.get("gpt", None)
+
+    async def get_features(self):
+        await self._ensure_loaded()
+        return dict(self._features)
+
+    async def set_feature(self, feature, enabled):
+        await self._ensure_loaded()
+        await self.config.custom("features").set_raw(feature, value=enabled)
+        self._features[feature] = enabled
+
+    async def get_rate_limit(self):
+        await self._ensure_loaded()
+        return dict(self._rate_limit)
+
+    async def set_rate_limit(self, max_requests, time_window):
+        await self._ensure_loaded()
+        rate_limit = {"max_requests": max_requests, "time_window": time_window}
+        await self.config.custom("rate_limit").set(rate_limit)
+        self._rate_limit = rate_limit
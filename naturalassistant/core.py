@@ -2,14 +2,23 @@ import logging
 import discord
 from discord.ext import tasks
 from redbot.core import commands, Config
+from redbot.core.data_manager import cog_data_path
 from collections import defaultdict
 import time
+import io
+import json
+from varislib import http, metrics, metrics_cog
+from varislib.snapshot import SnapshotStore
 from .intent_handler import match_intent
 from .permission_checker import check_user_permission
 from .pterodactyl_api import PterodactylAPI
 from .gpt_formatter import format_response_with_gpt
 from .config_manager import ConfigManager
-from .resource_monitor import check_system_resources, send_warning_to_admins
+from .job_queue import PowerActionQueue, POWER_ACTIONS
+from .resource_monitor import check_system_resources, AdminNotifier
+from .resource_sampler import ResourceSampler, ThresholdAlerts, METRICS
+from .process_table import ProcessTable
+from .phrase_index import PhraseIndex
 
 log = logging.getLogger("red.naturalassistant")
 
@@ -21,9 +30,19 @@ class NaturalAssistant(commands.Cog):
         self.config = Config.get_conf(self, identifier=9876543210)
         self.config_manager = ConfigManager(self.config)
         self.ptero_api = PterodactylAPI(self.config_manager)
+        self.power_queue = PowerActionQueue(self.ptero_api)
+        self.process_table = ProcessTable()
+        self.sampler = ResourceSampler(process_table=self.process_table)
+        self.sampler_window = 300  # Seconds of samples averaged for alerts
+        self.threshold_alerts = ThresholdAlerts()
+        self.admin_notifier = AdminNotifier(bot, self.config)
         self.resource_monitor_interval = 5  # Default interval in minutes
         self.rate_limits = defaultdict(list)  # Tracks user requests: {user_id: [timestamps]}
         self.message_cooldown = {}  # Tracks cooldown for sending messages per channel
+        self.fallback_index = None  # Built from fallback_phrases; rebuilt only when they change
+        self.fallback_phrases = {}  # Exact phrase lookups for actions and errors
+        self.default_fallback = "I'm unable to respond right now."
+        self.snapshots = None  # Runtime state saved across reloads, see snapshot_state
 
         # Initialize configuration groups with correct syntax
         self.config.register_custom("thresholds", default={"cpu": 80, "memory": 80, "disk": 80})
@@ -31,6 +50,7 @@ class NaturalAssistant(commands.Cog):
         self.config.register_custom("intents", default={})  # Ensure intents are initialized
         self.config.register_custom("features", default={"resource_monitoring": False, "intent_handling": False})
         self.config.register_custom("rate_limit", default={"max_requests": 5, "time_window": 60})  # 5 requests per 60 seconds
+        self.config.register_custom("sampler", default={"interval": 10, "capacity": 360, "window": 300, "hysteresis": 5})
         self.config.register_custom("fallback_phrases", default={
             "restart server": "The server is being restarted. Please wait a moment.",
             "check status": "The server status is being checked. Please hold on.",
@@ -56,6 +76,7 @@ class NaturalAssistant(commands.Cog):
             await self.config.custom("thresholds").set_default({"cpu": 80, "memory": 80, "disk": 80})
             await self.config.custom("api_keys").set_default({"ptero": None, "gpt": None})
             await self.config.custom("rate_limit").set_default({"max_requests": 5, "time_window": 60})
+            await self.config.custom("sampler").set_default({"interval": 10, "capacity": 360, "window": 300, "hysteresis": 5})
             log.info("Configuration groups initialized successfully.")
         except Exception as e:
             log.error(f"Error initializing configuration groups: {e}")
@@ -63,23 +84,81 @@ class NaturalAssistant(commands.Cog):
     async def cog_load(self):
         """Run initialization tasks when the cog is loaded."""
         await self.initialize_config()
+        self.ptero_api.http = http.acquire("naturalassistant")
+        await metrics_cog.attach(self.bot, "naturalassistant")
+        await self.config_manager.load()
+        await self.rebuild_fallback_index()
+        await self.configure_sampler()
+        self.snapshots = SnapshotStore(cog_data_path(self) / "state.snapshot", self.snapshot_state)
+        # Restored before the sampler and listeners start, so restored entries can't race new ones;
+        # it's one small file read in a worker thread
+        await self.restore_state(await self.snapshots.load())
+        self.snapshots.start()
+        features = await self.get_features()
+        if features.get("resource_monitoring", False):
+            self.sampler.start()
         self.resource_monitor_loop.change_interval(minutes=self.resource_monitor_interval)
         self.resource_monitor_loop.start()
         log.info("NaturalAssistant cog initialized.")
 
-    def cog_unload(self):
+    async def cog_unload(self):
         """Clean up tasks when the cog is unloaded."""
         self.resource_monitor_loop.cancel()
+        self.sampler.stop()
+        self.power_queue.close()
+        if self.snapshots:
+            await self.snapshots.stop()
+        await http.release("naturalassistant")
+        await metrics_cog.detach(self.bot, "naturalassistant")
         log.info("NaturalAssistant cog unloaded.")
 
+    def snapshot_state(self):
+        """Copy the in-memory state that would otherwise be lost on reload."""
+        return {
+            "rate_limits": {user_id: list(stamps) for user_id, stamps in self.rate_limits.items() if stamps},
+            "message_cooldown": dict(self.message_cooldown),
+            "admin_cooldowns": dict(self.admin_notifier.cooldowns),
+            "active_alerts": set(self.threshold_alerts.active),
+            "sampler": self.sampler.export(),
+        }
+
+    async def restore_state(self, state):
+        """Restore a snapshot, dropping entries that have expired since it was written."""
+        if not state:
+            return
+        now = time.time()
+        time_window = (await self.config_manager.get_rate_limit())["time_window"]
+        for user_id, stamps in state.get("rate_limits", {}).items():
+            recent = [t for t in stamps if now - t <= time_window]
+            if recent:
+                self.rate_limits[user_id] = recent
+        self.message_cooldown.update({k: t for k, t in state.get("message_cooldown", {}).items() if now - t < 60})
+        self.admin_notifier.cooldowns.update(
+            {k: t for k, t in state.get("admin_cooldowns", {}).items() if now - t < self.admin_notifier.cooldown}
+        )
+        # Alerts stay raised until usage drops below the hysteresis band, even across a restart
+        self.threshold_alerts.active.update(state.get("active_alerts", ()))
+        restored = self.sampler.restore(state.get("sampler", {}))
+        log.info(f"Restored runtime state from snapshot ({restored} resource samples).")
+
     async def get_features(self):
-        """Safely retrieve the features configuration group."""
-        try:
-            return await self.config.custom("features").all()
-        except ValueError:
-            # Initialize the features group if it is not already initialized
-            await self.config.custom("features").set({"resource_monitoring": False, "intent_handling": False})
-            return {"resource_monitoring": False, "intent_handling": False}
+        """The enabled features, served from the config mirror."""
+        return await self.config_manager.get_features()
+
+    async def configure_sampler(self):
+        """Rebuild the resource sampler from the saved sampler settings."""
+        settings = await self.config.custom("sampler").all()
+        was_running = self.sampler.running
+        self.sampler.stop()
+        self.sampler = ResourceSampler(
+            interval=settings.get("interval", 10),
+            capacity=settings.get("capacity", 360),
+            process_table=self.process_table,
+        )
+        self.sampler_window = settings.get("window", 300)
+        self.threshold_alerts.hysteresis = settings.get("hysteresis", 5)
+        if was_running:
+            self.sampler.start()
 
     async def send_message_with_cooldown(self, channel, content, cooldown=5):
         """Send a message to a channel with a cooldown to prevent spamming."""
@@ -91,15 +170,18 @@ class NaturalAssistant(commands.Cog):
         await channel.send(content)
 
     @tasks.loop(minutes=5)
+    @metrics.instrument("naturalassistant.resource_monitor_loop")
     async def resource_monitor_loop(self):
         try:
             features = await self.get_features()
             if not features.get("resource_monitoring", False):
                 return  # Skip if resource monitoring is disabled
 
-            warnings = await check_system_resources(self.config_manager)
+            warnings = await check_system_resources(
+                self.config_manager, self.sampler, self.threshold_alerts, self.sampler_window
+            )
             if warnings:
-                await send_warning_to_admins(self.bot, warnings)
+                await self.admin_notifier.dispatch(warnings)
         except Exception as e:
             log.error(f"Error in resource monitoring loop: {e}")
 
@@ -126,6 +208,30 @@ class NaturalAssistant(commands.Cog):
         await ctx.send("Listening channel removed.")
         log.info(f"Listening channel removed by {ctx.author}.")
 
+    @red.command(name="addadmin")
+    async def addadmin(self, ctx, user: discord.Member):
+        """Add a user who receives resource warnings."""
+        admins = await self.config.guild(ctx.guild).admin_ids()
+        if user.id in admins:
+            await ctx.send(f"{user.display_name} already receives resource warnings.")
+            return
+        admins.append(user.id)
+        await self.config.guild(ctx.guild).admin_ids.set(admins)
+        self.admin_notifier.invalidate()
+        await ctx.send(f"{user.display_name} will now receive resource warnings.")
+
+    @red.command(name="removeadmin")
+    async def removeadmin(self, ctx, user: discord.Member):
+        """Stop sending resource warnings to a user."""
+        admins = await self.config.guild(ctx.guild).admin_ids()
+        if user.id not in admins:
+            await ctx.send(f"{user.display_name} does not receive resource warnings.")
+            return
+        admins.remove(user.id)
+        await self.config.guild(ctx.guild).admin_ids.set(admins)
+        self.admin_notifier.invalidate()
+        await ctx.send(f"{user.display_name} will no longer receive resource warnings.")
+
     @red.command(name="addintent")
     async def addintent(self, ctx, phrase: str, action: str, server_id: str, *roles: discord.Role):
         """Add a new intent mapping."""
@@ -152,6 +258,44 @@ class NaturalAssistant(commands.Cog):
             embed.add_field(name=phrase, value=f"Action: {intent['action']}, Server: {intent['server_id']}", inline=False)
         await ctx.send(embed=embed)
 
+    @red.command(name="exportintents")
+    async def exportintents(self, ctx):
+        """Export all intents as a JSON file."""
+        intents = await self.config_manager.export_intents()
+        data = io.BytesIO(json.dumps(intents, indent=2).encode("utf-8"))
+        await ctx.send(f"Exported {len(intents)} intents.", file=discord.File(data, filename="intents.json"))
+
+    @red.command(name="importintents")
+    async def importintents(self, ctx, replace: bool = False):
+        """Import intents from an attached JSON file. Pass `True` to replace existing intents."""
+        if not ctx.message.attachments:
+            await ctx.send("Attach a JSON file exported with `exportintents`.")
+            return
+        try:
+            intents = json.loads(await ctx.message.attachments[0].read())
+            count = await self.config_manager.import_intents(intents, replace=replace)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            await ctx.send(f"Invalid intents file: {e}")
+            return
+        await ctx.send(f"Imported {count} intents.")
+        log.info(f"{count} intents imported by {ctx.author} (replace={replace}).")
+
+    @red.command(name="addfallback")
+    async def addfallback(self, ctx, phrase: str, *, response: str):
+        """Add or replace a fallback phrase and its response."""
+        await self.config.custom("fallback_phrases").set_raw(phrase.lower(), value=response)
+        await self.rebuild_fallback_index()
+        await ctx.send(f"Fallback phrase '{phrase}' saved.")
+        log.info(f"Fallback phrase '{phrase}' saved by {ctx.author}.")
+
+    @red.command(name="removefallback")
+    async def removefallback(self, ctx, *, phrase: str):
+        """Remove a fallback phrase."""
+        await self.config.custom("fallback_phrases").clear_raw(phrase.lower())
+        await self.rebuild_fallback_index()
+        await ctx.send(f"Fallback phrase '{phrase}' removed.")
+        log.info(f"Fallback phrase '{phrase}' removed by {ctx.author}.")
+
     @red.command(name="setapikey")
     async def setapikey(self, ctx, api_key: str):
         """Set the Pterodactyl API key."""
@@ -174,7 +318,9 @@ class NaturalAssistant(commands.Cog):
             await ctx.send(f"Invalid feature. Valid features are: {', '.join(valid_features)}.")
             return
 
-        await self.config.custom("features").set_raw(feature, value=True)
+        await self.config_manager.set_feature(feature, True)
+        if feature == "resource_monitoring":
+            self.sampler.start()
         await ctx.send(f"Feature '{feature}' has been enabled.")
         log.info(f"Feature '{feature}' enabled by {ctx.author}.")
 
@@ -186,7 +332,9 @@ class NaturalAssistant(commands.Cog):
             await ctx.send(f"Invalid feature. Valid features are: {', '.join(valid_features)}.")
             return
 
-        await self.config.custom("features").set_raw(feature, value=False)
+        await self.config_manager.set_feature(feature, False)
+        if feature == "resource_monitoring":
+            self.sampler.stop()
         await ctx.send(f"Feature '{feature}' has been disabled.")
         log.info(f"Feature '{feature}' disabled by {ctx.author}.")
 
@@ -201,6 +349,58 @@ class NaturalAssistant(commands.Cog):
         await ctx.send(f"Resource monitoring interval set to {minutes} minutes.")
         log.info(f"Resource monitoring interval updated to {minutes} minutes by {ctx.author}.")
 
+    @red.command(name="setsampling")
+    async def setsampling(self, ctx, interval: int, history_minutes: int = 60):
+        """Set the resource sampling interval (seconds) and how many minutes of history to keep."""
+        if interval < 1 or history_minutes < 1:
+            await ctx.send("Interval and history must both be at least 1.")
+            return
+
+        capacity = max(1, history_minutes * 60 // interval)
+        await self.config.custom("sampler").set_raw("interval", value=interval)
+        await self.config.custom("sampler").set_raw("capacity", value=capacity)
+        await self.configure_sampler()
+        await ctx.send(f"Sampling every {interval} seconds, keeping {capacity} samples ({history_minutes} minutes).")
+        log.info(f"Resource sampling set to {interval}s/{capacity} samples by {ctx.author}.")
+
+    @red.command(name="history")
+    async def history(self, ctx, minutes: int = 30):
+        """Show recent resource usage history."""
+        if not len(self.sampler.timestamps):
+            await ctx.send("No samples collected yet. Is resource_monitoring enabled?")
+            return
+
+        seconds = minutes * 60
+        lines = []
+        for metric in METRICS:
+            latest, mean, p95 = self.sampler.summary(metric, seconds)
+            if metric.startswith("net_"):
+                stats = f"now {latest / 1024:8.1f} KB/s  avg {mean / 1024:8.1f}  p95 {p95 / 1024:8.1f}"
+            elif metric.startswith("load"):
+                stats = f"now {latest:8.2f}       avg {mean:8.2f}  p95 {p95:8.2f}"
+            else:
+                stats = f"now {latest:8.1f}%      avg {mean:8.1f}  p95 {p95:8.1f}"
+            lines.append(f"{metric:<8} {self.sampler.sparkline(metric, seconds)}\n         {stats}")
+
+        active = ", ".join(sorted(self.threshold_alerts.active)) or "none"
+        body = "\n".join(lines)
+        await ctx.send(f"Resource history (last {minutes} min, active alerts: {active})\n```\n{body}\n```")
+
+    @red.command(name="processes")
+    async def processes(self, ctx, limit: int = 10):
+        """Show resource usage per game server, container and the host."""
+        if not self.process_table.usage:
+            await ctx.send("No process samples collected yet. Is resource_monitoring enabled?")
+            return
+
+        lines = [f"{'Owner':<24} {'Procs':>5} {'CPU %':>7} {'RSS':>10}"]
+        for owner, stats in self.process_table.top(limit=limit, include_host=True):
+            lines.append(
+                f"{owner:<24} {stats['processes']:>5} {stats['cpu']:>7.1f} {stats['rss'] / 1024 ** 2:>7.0f} MB"
+            )
+        body = "\n".join(lines)
+        await ctx.send(f"Tracking {len(self.process_table)} processes\n```\n{body}\n```")
+
     @red.command(name="setratelimit")
     async def setratelimit(self, ctx, max_requests: int, time_window: int):
         """Set the rate limit (max requests and time window in seconds)."""
@@ -208,13 +408,13 @@ class NaturalAssistant(commands.Cog):
             await ctx.send("Both max requests and time window must be at least 1.")
             return
 
-        await self.config.custom("rate_limit").set({"max_requests": max_requests, "time_window": time_window})
+        await self.config_manager.set_rate_limit(max_requests, time_window)
         await ctx.send(f"Rate limit set to {max_requests} requests per {time_window} seconds.")
         log.info(f"Rate limit updated to {max_requests} requests per {time_window} seconds by {ctx.author}.")
 
     async def is_rate_limited(self, user_id):
         """Check if a user is rate-limited."""
-        rate_limit_config = await self.config.custom("rate_limit").all()
+        rate_limit_config = await self.config_manager.get_rate_limit()
         max_requests = rate_limit_config["max_requests"]
         time_window = rate_limit_config["time_window"]
 
@@ -232,10 +432,28 @@ class NaturalAssistant(commands.Cog):
         self.rate_limits[user_id].append(now)
         return False
 
-    async def get_fallback_response(self, intent_phrase):
-        """Get a fallback response for a given intent."""
-        fallback_phrases = await self.config.custom("fallback_phrases").all()
-        return fallback_phrases.get(intent_phrase.lower(), fallback_phrases.get("default", "I'm unable to respond right now."))
+    async def rebuild_fallback_index(self):
+        """Rebuild the fuzzy fallback index from the saved fallback phrases."""
+        fallback_phrases = dict(await self.config.custom("fallback_phrases").all())
+        self.default_fallback = fallback_phrases.pop("default", "I'm unable to respond right now.")
+        self.fallback_phrases = fallback_phrases
+        self.fallback_index = PhraseIndex(fallback_phrases)
+
+    async def get_fallback_response(self, message):
+        """Get the fallback response that best matches a free-text message."""
+        if self.fallback_index is None:
+            await self.rebuild_fallback_index()
+        match = self.fallback_index.match(message)
+        return match[1] if match else self.default_fallback
+
+    async def get_action_fallback(self, action):
+        """Get the fallback response saved for exactly this action, or the default.
+
+        Never fuzzy: a failed "restart" must not be answered with the "restart server" success text.
+        """
+        if self.fallback_index is None:
+            await self.rebuild_fallback_index()
+        return self.fallback_phrases.get(str(action).lower(), self.default_fallback)
 
     async def save_learned_intent(self, phrase, action, server_id, roles):
         """Save a new intent learned from GPT responses."""
@@ -243,6 +461,7 @@ class NaturalAssistant(commands.Cog):
         log.info(f"Learned new intent: '{phrase}' with action '{action}' for server '{server_id}'.")
 
     @commands.Cog.listener()
+    @metrics.instrument("naturalassistant.on_message")
     async def on_message(self, message):
         try:
             features = await self.get_features()
@@ -271,13 +490,17 @@ class NaturalAssistant(commands.Cog):
                 action = intent["action"]
                 server_id = intent["server_id"]
                 try:
+                    # Power actions are queued per server so concurrent requests share one job
+                    if action in POWER_ACTIONS:
+                        response = await self.power_queue.submit(action, server_id)
+                    else:
+                        response = await self.ptero_api.handle_action(action, server_id)
                     # Attempt to use GPT for the response
-                    response = await self.ptero_api.handle_action(action, server_id)
                     formatted_response = await format_response_with_gpt(response)
                 except Exception as e:
                     log.error(f"GPT error: {e}")
                     # Fallback to predefined phrases if GPT fails
-                    formatted_response = await self.get_fallback_response(action)
+                    formatted_response = await self.get_action_fallback(action)
 
                 await self.send_message_with_cooldown(message.channel, formatted_response)
             else:
@@ -286,5 +509,5 @@ class NaturalAssistant(commands.Cog):
                 await self.send_message_with_cooldown(message.channel, fallback_response)
         except Exception as e:
             log.error(f"Error processing message: {e}")
-            fallback_response = await self.get_fallback_response("default")
+            fallback_response = await self.get_action_fallback("default")
             await self.send_message_with_cooldown(message.channel, fallback_response)
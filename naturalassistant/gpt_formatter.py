@@ -1,7 +1,7 @@
-import openai
-
 async def format_response_with_gpt(result):
     try:
+        import openai  # Heavy; only imported once a response is actually formatted
+
         response = openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
             messages=[
@@ -1,10 +1,9 @@
 from .gpt_formatter import format_response_with_gpt
 
 async def match_intent(message, config_manager):
-    intents = await config_manager.list_intents()
-    for phrase, intent in intents.items():
-        if phrase.lower() in message.lower():
-            return intent
+    intent = await config_manager.find_intent(message)
+    if intent:
+        return intent
 
     # Fallback: Use GPT to predict intent if no saved intent matches
     try:
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger("red.naturalassistant")
+
+POWER_ACTIONS = ("start", "stop", "restart")
+
+
+class PowerActionQueue:
+    """Serialize and deduplicate Pterodactyl power actions per server."""
+
+    def __init__(self, ptero_api, merge_window=15):
+        self.ptero_api = ptero_api
+        self.merge_window = merge_window
+        self._queues = {}  # {server_id: asyncio.Queue}
+        self._workers = {}  # {server_id: asyncio.Task}
+        self._last = {}  # {server_id: (action, future, submitted_at)} of the most recently queued job
+        self._pending = set()  # Futures of jobs not yet finished
+
+    async def submit(self, action, server_id):
+        """Queue a power action and wait for its (possibly shared) result."""
+        now = time.monotonic()
+        # Only merge into the last job queued for the server: with another action
+        # in between (restart, stop, restart) the repeat must still run.
+        job = self._last.get(server_id)
+        if job is not None:
+            last_action, future, submitted_at = job
+            if last_action == action and (not future.done() or now - submitted_at < self.merge_window):
+                log.info(f"Merged duplicate '{action}' request for server {server_id}.")
+                return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._last[server_id] = (action, future, now)
+        self._pending.add(future)
+        self._queue_for(server_id).put_nowait((action, future))
+        return await asyncio.shield(future)
+
+    def _queue_for(self, server_id):
+        queue = self._queues.get(server_id)
+        if queue is None:
+            queue = self._queues[server_id] = asyncio.Queue()
+        worker = self._workers.get(server_id)
+        if worker is None or worker.done():
+            self._workers[server_id] = asyncio.create_task(self._worker(server_id, queue))
+        return queue
+
+    async def _worker(self, server_id, queue):
+        # Actions for one server run strictly in submission order; each server
+        # has its own worker so different servers proceed in parallel.
+        while True:
+            action, future = await queue.get()
+            try:
+                result = await self.ptero_api.handle_action(action, server_id)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                log.error(f"Power action '{action}' failed for server {server_id}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._pending.discard(future)
+                queue.task_done()
+
+    def close(self):
+        """Cancel all workers and fail any jobs still waiting in the queues."""
+        for worker in self._workers.values():
+            worker.cancel()
+        for future in self._pending:
+            if not future.done():
+                future.cancel()
+        self._workers.clear()
+        self._queues.clear()
+        self._last.clear()
+        self._pending.clear()
@@ -0,0 +1,61 @@
+import re
+from collections import defaultdict
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PhraseIndex:
+    """Trigram inverted index for fuzzy matching of short phrases."""
+
+    def __init__(self, phrases, threshold=0.5):
+        self.threshold = threshold
+        self._responses = {}  # {normalized phrase: response}
+        self._sizes = {}  # {normalized phrase: trigram count}
+        self._postings = defaultdict(list)  # {trigram: [normalized phrase, ...]}
+        for phrase, response in phrases.items():
+            key = normalize(phrase)
+            if not key or key in self._responses:
+                continue
+            grams = trigrams(key)
+            self._responses[key] = response
+            self._sizes[key] = len(grams)
+            for gram in grams:
+                self._postings[gram].append(key)
+
+    def __len__(self):
+        return len(self._responses)
+
+    def match(self, text):
+        """Return (phrase, response, score) for the best match above the threshold, or None."""
+        key = normalize(text)
+        if not key:
+            return None
+        if key in self._responses:
+            return key, self._responses[key], 1.0
+
+        grams = trigrams(key)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for phrase in self._postings.get(gram, ()):
+                overlap[phrase] += 1
+
+        best, best_score = None, 0.0
+        for phrase, shared in overlap.items():
+            score = 2 * shared / (len(grams) + self._sizes[phrase])  # Dice coefficient
+            if score > best_score:
+                best, best_score = phrase, score
+
+        if best is None or best_score < self.threshold:
+            return None
+        return best, self._responses[best], best_score
@@ -0,0 +1,153 @@
+import logging
+import re
+
+log = logging.getLogger("red.naturalassistant")
+
+# Matches the container id in cgroup paths written by docker, containerd and podman
+CONTAINER_RE = re.compile(r"(?:docker|containerd|libpod|cri-containerd)[-/]([0-9a-f]{12,64})")
+HOST = "host"
+
+
+def resolve_owner(proc):
+    """Work out which game server or container a process belongs to."""
+    # Pterodactyl Wings sets P_SERVER_UUID inside every server container; the
+    # first 8 characters are the short identifier used by the client API.
+    import psutil
+
+    try:
+        uuid = proc.environ().get("P_SERVER_UUID")
+        if uuid:
+            return f"server:{uuid[:8]}"
+    except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess, OSError):
+        pass
+
+    try:
+        with open(f"/proc/{proc.pid}/cgroup") as f:
+            match = CONTAINER_RE.search(f.read())
+        if match:
+            return f"container:{match.group(1)[:12]}"
+    except OSError:
+        pass
+    return HOST
+
+
+class ProcessTable:
+    """Incrementally maintained table of process handles grouped by owner.
+
+    New PIDs are classified once; owners are cached by (pid, create_time), so a
+    reused PID is never attributed to the previous process's server. Only
+    processes owned by a game server or container are read on every refresh.
+    Everything else is counted towards the host, as the system total minus the
+    tracked processes, so hosts with thousands of processes stay cheap to sample.
+    """
+
+    def __init__(self, rescan_every=30):
+        self._procs = {}  # {pid: psutil.Process} owned by a server or container, read every refresh
+        self._host = {}  # {pid: create_time} of the remaining processes, not read per refresh
+        self._owners = {}  # {(pid, create_time): owner}
+        self.rescan_every = rescan_every  # Refreshes between checks for reused host PIDs
+        self._refreshes = 0
+        self._cpu_times = None  # (busy, total) seconds at the previous refresh
+        self.usage = {}  # {owner: {"cpu": percent, "rss": bytes, "processes": count}}
+
+    def __len__(self):
+        return len(self._procs) + len(self._host)
+
+    def _add(self, pid):
+        import psutil
+
+        try:
+            proc = psutil.Process(pid)
+            key = (pid, proc.create_time())
+            owner = self._owners.get(key)
+            if owner is None:
+                owner = self._owners[key] = resolve_owner(proc)
+            if owner != HOST:
+                proc.cpu_percent(interval=None)  # Prime so the next reading covers one interval
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return
+        if owner == HOST:
+            self._host[pid] = key[1]
+        else:
+            self._procs[pid] = proc
+
+    def _remove(self, pid):
+        proc = self._procs.pop(pid, None)
+        create_time = proc.create_time() if proc is not None else self._host.pop(pid, None)
+        self._owners.pop((pid, create_time), None)
+
+    def _check_host_pids(self):
+        """Reclassify host PIDs that were reused by a new process since they were seen."""
+        import psutil
+
+        for pid, create_time in list(self._host.items()):
+            try:
+                reused = psutil.Process(pid).create_time() != create_time
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                reused = True
+            if reused:
+                self._remove(pid)
+                self._add(pid)
+
+    def _system_cpu(self):
+        """Whole-machine CPU since the last refresh, in the same per-core percent as Process.cpu_percent."""
+        import psutil
+
+        times = psutil.cpu_times()
+        total = sum(times)
+        busy = total - times.idle - getattr(times, "iowait", 0)
+        last, self._cpu_times = self._cpu_times, (busy, total)
+        if last is None or total <= last[1]:
+            return 0.0
+        return (busy - last[0]) / (total - last[1]) * 100 * (psutil.cpu_count() or 1)
+
+    def refresh(self):
+        """Sync the table with the running processes and recompute per-owner usage."""
+        import psutil
+
+        pids = set(psutil.pids())
+        known = self._procs.keys() | self._host.keys()
+        for pid in known - pids:
+            self._remove(pid)
+        self._refreshes += 1
+        if self._refreshes % self.rescan_every == 0:
+            self._check_host_pids()
+        for pid in pids - known:
+            self._add(pid)
+
+        usage = {}
+        tracked_cpu = tracked_rss = 0
+        for pid, proc in list(self._procs.items()):
+            if not proc.is_running():
+                # Gone, or the PID now belongs to another process: classify it afresh
+                self._remove(pid)
+                self._add(pid)
+                continue
+            try:
+                with proc.oneshot():
+                    cpu = proc.cpu_percent(interval=None)
+                    rss = proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                self._remove(pid)
+                continue
+            entry = usage.setdefault(self._owners[(pid, proc.create_time())], {"cpu": 0.0, "rss": 0, "processes": 0})
+            entry["cpu"] += cpu
+            entry["rss"] += rss
+            entry["processes"] += 1
+            tracked_cpu += cpu
+            tracked_rss += rss
+
+        memory = psutil.virtual_memory()
+        usage[HOST] = {
+            "cpu": max(0.0, self._system_cpu() - tracked_cpu),
+            "rss": max(0, memory.total - memory.available - tracked_rss),
+            "processes": len(self._host),
+        }
+        self.usage = usage
+        return usage
+
+    def top(self, key="rss", limit=5, include_host=False):
+        """Return the heaviest owners sorted by `key`."""
+        owners = [(owner, stats) for owner, stats in self.usage.items() if include_host or owner != HOST]
+        owners.sort(key=lambda item: item[1][key], reverse=True)
+        return owners[:limit]
@@ -1,59 +1,95 @@
-import psutil
+import asyncio
 import logging
 import time
 
 log = logging.getLogger("red.naturalassistant")
 
-async def check_system_resources(config_manager):
+async def check_system_resources(config_manager, sampler, alerts, window=300):
     warnings = []
     try:
         # Ensure thresholds are initialized with default values
         thresholds = await config_manager.config.custom("thresholds").all()
-        cpu_threshold = thresholds.get("cpu", 80)
-        memory_threshold = thresholds.get("memory", 80)
-        disk_threshold = thresholds.get("disk", 80)
+        warnings = alerts.evaluate(sampler, thresholds, window)
+        if warnings and sampler.process_table is not None:
+            top = sampler.process_table.top(limit=3)
+            if top:
+                consumers = ", ".join(
+                    f"{owner} ({stats['rss'] / 1024 ** 3:.1f} GB, {stats['cpu']:.0f}% CPU)" for owner, stats in top
+                )
+                warnings.append(f"Top consumers: {consumers}.")
+    except Exception as e:
+        log.error(f"Error checking system resources: {e}")
+        warnings.append("An error occurred while checking system resources.")
 
-        cpu_usage = psutil.cpu_percent()
-        memory_usage = psutil.virtual_memory().percent
-        disk_usage = psutil.disk_usage("/").percent
+    return warnings
 
-        if cpu_usage > cpu_threshold:
-            warnings.append(f"CPU usage is at {cpu_usage}% (Threshold: {cpu_threshold}%).")
+class AdminNotifier:
+    """Send resource warnings to admins as one digest per admin, concurrently."""
 
-        if memory_usage > memory_threshold:
-            warnings.append(f"Memory usage is at {memory_usage}% (Threshold: {memory_threshold}%).")
+    def __init__(self, bot, config, cooldown=300, concurrency=5, admin_ttl=600):
+        self.bot = bot
+        self.config = config
+        self.cooldown = cooldown  # Seconds between digests to the same admin
+        self.admin_ttl = admin_ttl
+        self.cooldowns = {}  # {admin_id: last digest timestamp}, kept across loop runs
+        self._admins = None  # {admin_id: [guild_id, ...]}
+        self._admins_loaded = 0
+        # DMs go out in parallel, but only a few at a time so discord.py's
+        # rate-limit handling isn't flooded with 429s on large bots.
+        self._semaphore = asyncio.Semaphore(concurrency)
 
-        if disk_usage > disk_threshold:
-            warnings.append(f"Disk usage is at {disk_usage}% (Threshold: {disk_threshold}%).")
+    def invalidate(self):
+        """Drop the cached admin map so it is rebuilt on the next dispatch."""
+        self._admins = None
 
-    except Exception as e:
-        log.error(f"Error checking system resources: {e}")
-        warnings.append("An error occurred while checking system resources.")
+    async def admin_map(self):
+        if self._admins is None or time.monotonic() - self._admins_loaded > self.admin_ttl:
+            admins = {}
+            for guild_id, data in (await self.config.all_guilds()).items():
+                for admin_id in data.get("admin_ids", []):
+                    admins.setdefault(admin_id, []).append(guild_id)
+            self._admins = admins
+            self._admins_loaded = time.monotonic()
+        return self._admins
 
-    return warnings
+    async def dispatch(self, warnings):
+        """Send a warning digest to every admin not on cooldown; returns the number sent."""
+        if not warnings:
+            return 0
 
-async def send_warning_to_admins(bot, warnings):
-    if not warnings:
-        return
-
-    cog = bot.get_cog("NaturalAssistant")
-    if not cog:
-        log.error("NaturalAssistant cog is not loaded. Cannot send warnings to admins.")
-        return
-
-    cooldowns = {}  # Track cooldowns for each guild
-    for guild in bot.guilds:
-        try:
-            now = time.time()
-            if guild.id in cooldowns and now - cooldowns[guild.id] < 300:  # 5-minute cooldown
-                log.warning(f"Skipping warnings for guild {guild.id} due to cooldown.")
+        now = time.time()
+        admins = await self.admin_map()
+        due = {}
+        for admin_id, guild_ids in admins.items():
+            if now - self.cooldowns.get(admin_id, 0) < self.cooldown:
                 continue
-            cooldowns[guild.id] = now
-
-            admin_ids = await cog.config.guild(guild).get_raw("admin_ids", default=[])
-            for admin_id in admin_ids:
-                admin = guild.get_member(admin_id)
-                if admin:
-                    await admin.send("\n".join(warnings))
-        except Exception as e:
-            log.error(f"Error sending warnings to admins in guild {guild.id}: {e}")
+            guilds = [g for g in map(self.bot.get_guild, guild_ids) if g is not None]
+            if guilds:
+                due[admin_id] = guilds
+
+        if len(due) < len(admins):
+            log.warning(f"Skipping warnings for {len(admins) - len(due)} admin(s) on cooldown or not found.")
+
+        results = await asyncio.gather(*(self._send(admin_id, guilds, warnings, now) for admin_id, guilds in due.items()))
+        return sum(results)
+
+    async def _send(self, admin_id, guilds, warnings, now):
+        admin = None
+        for guild in guilds:
+            admin = guild.get_member(admin_id)
+            if admin:
+                break
+        if not admin:
+            return False
+
+        # Mark the cooldown before sending so a failing DM isn't retried every run
+        self.cooldowns[admin_id] = now
+        servers = ", ".join(guild.name for guild in guilds)
+        digest = f"**Resource warnings** (you are an admin in: {servers})\n" + "\n".join(f"- {w}" for w in warnings)
+        async with self._semaphore:
+            try:
+                await admin.send(digest)
+                return True
+            except Exception as e:
+                log.error(f"Error sending warnings to admin {admin_id}: {e}")
+                return False
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from array import array
+
+log = logging.getLogger("red.naturalassistant")
+
+METRICS = ("cpu", "memory", "disk", "net_sent", "net_recv", "load1", "load5", "load15")
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+ALERT_LABELS = {"cpu": "CPU", "memory": "Memory", "disk": "Disk"}
+
+
+class RingBuffer:
+    """Fixed-size, array-backed buffer of float samples."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self, last=None):
+        """Return up to `last` most recent samples, oldest first."""
+        count = self._count if last is None else min(last, self._count)
+        start = (self._next - count) % self.capacity
+        if start + count <= self.capacity:
+            return self._data[start:start + count].tolist()
+        return self._data[start:].tolist() + self._data[:self._next].tolist()
+
+    def latest(self):
+        if not self._count:
+            return None
+        return self._data[(self._next - 1) % self.capacity]
+
+    def mean(self, last=None):
+        values = self.values(last)
+        return sum(values) / len(values) if values else None
+
+    def percentile(self, pct, last=None):
+        values = sorted(self.values(last))
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+        return values[index]
+
+
+class ResourceSampler:
+    """Sample host resources in a worker thread and keep a bounded history."""
+
+    def __init__(self, interval=10, capacity=360, disk_path="/", process_table=None):
+        self.interval = interval
+        self.capacity = capacity
+        self.disk_path = disk_path
+        self.process_table = process_table
+        self.timestamps = RingBuffer(capacity)
+        self.series = {metric: RingBuffer(capacity) for metric in METRICS}
+        self._last_net = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        import psutil  # Only needed once monitoring is enabled
+
+        psutil.cpu_percent(interval=None)  # Prime the counter; the first reading is meaningless
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                sample = await asyncio.to_thread(self._sample)
+                self._record(sample)
+            except Exception as e:
+                log.error(f"Error sampling system resources: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _sample(self):
+        import psutil
+
+        now = time.time()
+        net = psutil.net_io_counters()
+        if self._last_net is None:
+            sent_rate = recv_rate = 0.0
+        else:
+            last_time, last_sent, last_recv = self._last_net
+            elapsed = max(now - last_time, 1e-6)
+            sent_rate = (net.bytes_sent - last_sent) / elapsed
+            recv_rate = (net.bytes_recv - last_recv) / elapsed
+        self._last_net = (now, net.bytes_sent, net.bytes_recv)
+        load1, load5, load15 = psutil.getloadavg()
+        if self.process_table is not None:
+            self.process_table.refresh()
+        return now, {
+            # cpu_percent(None) measures usage since the previous call, i.e. over the sampling interval
+            "cpu": psutil.cpu_percent(interval=None),
+            "memory": psutil.virtual_memory().percent,
+            "disk": psutil.disk_usage(self.disk_path).percent,
+            "net_sent": sent_rate,
+            "net_recv": recv_rate,
+            "load1": load1,
+            "load5": load5,
+            "load15": load15,
+        }
+
+    def _record(self, sample):
+        timestamp, values = sample
+        self.timestamps.append(timestamp)
+        for metric, value in values.items():
+            self.series[metric].append(value)
+
+    def export(self):
+        """Copy of the recorded history, for snapshots."""
+        history = {metric: series.values() for metric, series in self.series.items()}
+        history["timestamps"] = self.timestamps.values()
+        return history
+
+    def restore(self, history):
+        """Replay an exported history, keeping only samples still inside the buffer's time span."""
+        timestamps = history.get("timestamps", [])
+        if any(len(history.get(metric, ())) != len(timestamps) for metric in METRICS):
+            return 0
+        cutoff = time.time() - self.capacity * self.interval
+        keep = [i for i, timestamp in enumerate(timestamps) if timestamp >= cutoff][-self.capacity:]
+        for i in keep:
+            self._record((timestamps[i], {metric: history[metric][i] for metric in METRICS}))
+        return len(keep)
+
+    def samples_for(self, seconds):
+        """Number of samples covering the last `seconds` seconds."""
+        return max(1, int(seconds // self.interval))
+
+    def summary(self, metric, seconds):
+        """Return (latest, mean, p95) for a metric over a time window."""
+        series = self.series[metric]
+        last = self.samples_for(seconds)
+        return series.latest(), series.mean(last), series.percentile(95, last)
+
+    def sparkline(self, metric, seconds, width=40):
+        """Render a metric's recent history as a unicode sparkline."""
+        values = self.series[metric].values(self.samples_for(seconds))
+        if not values:
+            return ""
+        if len(values) > width:
+            # Average consecutive samples into `width` buckets
+            step = len(values) / width
+            values = [
+                sum(bucket) / len(bucket)
+                for bucket in (values[int(i * step):int((i + 1) * step)] for i in range(width))
+                if bucket
+            ]
+        low, high = min(values), max(values)
+        span = (high - low) or 1
+        return "".join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+class ThresholdAlerts:
+    """Raise alerts on rolling averages and clear them with hysteresis."""
+
+    def __init__(self, hysteresis=5):
+        self.hysteresis = hysteresis
+        self.active = set()
+
+    def evaluate(self, sampler, thresholds, window):
+        """Update the alert state and return warnings for every active alert."""
+        warnings = []
+        for metric, label in ALERT_LABELS.items():
+            threshold = thresholds.get(metric, 80)
+            latest, mean, p95 = sampler.summary(metric, window)
+            if mean is None:
+                continue
+
+            if metric in self.active:
+                # Only clear once the average has dropped well below the threshold
+                if mean < threshold - self.hysteresis:
+                    self.active.discard(metric)
+                    log.info(f"{metric} alert cleared (avg {mean:.1f}%).")
+            elif mean > threshold:
+                self.active.add(metric)
+
+            if metric in self.active:
+                warnings.append(
+                    f"{label} usage averaged {mean:.1f}% over the last {window}s "
+                    f"(p95 {p95:.1f}%, now {latest:.1f}%, threshold {threshold}%)."
+                )
+        return warnings
@@ -1,14 +1,20 @@
 import discord
 import asyncio
+import datetime
+import time
 import os  # Import the os module for system commands
 import logging
 from discord.ext import tasks
 from redbot.core import commands
-import aiohttp
+from redbot.core.data_manager import cog_data_path
+
+from varislib import http, metrics, metrics_cog
+from varislib.snapshot import SnapshotStore
 
 from .config import get_config_schema
 from .utils import fetch_alerts, fetch_current_conditions, fetch_mesoscale_discussions
 from .embeds import build_admin_embed, build_announcement_embed
+from .spc import SPCOverlay, CATEGORIES, CATEGORY_NAMES, is_elevated, watch_names
 
 log = logging.getLogger("nwsshutdown")
 
@@ -20,13 +26,62 @@ class SevereWeatherShutdown(commands.Cog):
         self.config = get_config_schema(self)
         self.shutdown_pending = False
         self.shutdown_timer_task = None
+        self.http = None
+        self.handled_alerts = {}  # {"guild_id:alert_id": expiry timestamp}; alerts already acted on
+        self.snapshots = None
+        self.overlay = SPCOverlay()
+        self.risk = {}  # {guild_id: (outlook category index, watch flags)}, rebuilt with the overlay
+        self.alert_interval = 60  # Minutes between alert checks; shortened while any guild is at elevated risk
+        self.elevated_interval = 5
+
+    async def cog_load(self):
+        self.http = http.acquire("nwsshutdown")
+        await metrics_cog.attach(self.bot, "nwsshutdown")
+        self.snapshots = SnapshotStore(cog_data_path(self) / "state.snapshot", self.snapshot_state)
+        state = await self.snapshots.load()
+        if state:
+            now = time.time()
+            self.handled_alerts.update({key: expires for key, expires in state.get("handled_alerts", {}).items() if expires > now})
+        self.snapshots.start()
         self.alert_check_loop.start()
+        self.overlay_loop.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.alert_check_loop.cancel()
+        self.overlay_loop.cancel()
+        if self.snapshots:
+            await self.snapshots.stop()
+        await http.release("nwsshutdown")
+        await metrics_cog.detach(self.bot, "nwsshutdown")
+
+    @property
+    def session(self):
+        return self.http.session("weather")
+
+    def snapshot_state(self):
+        return {"handled_alerts": dict(self.handled_alerts)}
+
+    @staticmethod
+    def alert_key(guild, alert):
+        alert_id = alert.get("id") or alert["properties"].get("id")
+        return f"{guild.id}:{alert_id}" if alert_id else None
+
+    def mark_handled(self, guild, alert):
+        """Remember an alert until it expires so it doesn't notify admins again, even after a restart."""
+        key = self.alert_key(guild, alert)
+        if key is None:
+            return
+        try:
+            expires = datetime.datetime.fromisoformat(alert["properties"]["expires"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            expires = time.time() + 6 * 3600
+        self.handled_alerts[key] = expires
 
     @tasks.loop(hours=1)
+    @metrics.instrument("nwsshutdown.alert_check_loop")
     async def alert_check_loop(self):
+        now = time.time()
+        self.handled_alerts = {key: expires for key, expires in self.handled_alerts.items() if expires > now}
         for guild in self.bot.guilds:
             enabled = await self.config.guild(guild).enabled()
             if not enabled:
@@ -37,24 +92,77 @@ class SevereWeatherShutdown(commands.Cog):
             if not lat or not lon:
                 continue
 
-            alerts = await fetch_alerts(lat, lon)
+            alerts = await fetch_alerts(self.session, lat, lon)
             if not alerts:
                 continue
 
             valid_alerts = await self.config.guild(guild).alerts()
-            matches = [a for a in alerts if a['properties']['event'] in valid_alerts]
+            matches = [
+                a for a in alerts
+                if a['properties']['event'] in valid_alerts and self.alert_key(guild, a) not in self.handled_alerts
+            ]
 
             if matches and not self.shutdown_pending:
                 self.shutdown_pending = True
+                self.mark_handled(guild, matches[0])
+                await self.snapshots.save()  # Don't wait for the periodic write; a crash would re-notify
                 await self.handle_alert(guild, matches[0])
 
+    @tasks.loop(minutes=10)
+    @metrics.instrument("nwsshutdown.overlay_loop")
+    async def overlay_loop(self):
+        locations = await self.guild_locations()
+        if not locations:
+            # Nothing to look up, so don't download the products at all
+            self.risk = {}
+            self.set_alert_interval(60)
+            return
+        # Conditional requests make this cheap when SPC hasn't published anything new
+        try:
+            await self.overlay.refresh(self.session)
+        except Exception as e:
+            log.error(f"Failed to refresh SPC overlay: {e}")
+        await self.update_risk(locations)
+
+    async def guild_locations(self):
+        """(guild, lat, lon) for every guild with alerts enabled and a location set."""
+        locations = []
+        for guild in self.bot.guilds:
+            config = await self.config.guild(guild).all()
+            if config["enabled"] and config["lat"] and config["lon"]:
+                locations.append((guild, config["lat"], config["lon"]))
+        return locations
+
+    async def update_risk(self, locations):
+        """Recompute each guild's risk from the overlay and adjust the alert polling rate."""
+        if not self.overlay.loaded:
+            return
+        risk = {}
+        for guild, lat, lon in locations:
+            try:
+                zones = await self.overlay.zones_for(self.session, lat, lon)
+            except Exception as e:
+                log.error(f"Failed to fetch zones for guild {guild.name}: {e}")
+                zones = ()
+            risk[guild.id] = self.overlay.lookup(lat, lon, zones)
+            if is_elevated(*risk[guild.id]) and not is_elevated(*self.risk.get(guild.id, (0, 0))):
+                log.info(f"Guild {guild.name} is at elevated severe weather risk.")
+        self.risk = risk
+        self.set_alert_interval(self.elevated_interval if any(is_elevated(*r) for r in risk.values()) else 60)
+
+    def set_alert_interval(self, interval):
+        if interval != self.alert_interval:
+            self.alert_interval = interval
+            # Takes effect immediately; an overdue check runs right away
+            self.alert_check_loop.change_interval(minutes=interval)
+            log.info(f"Checking weather alerts every {interval} minutes.")
+
     async def get_county_from_latlon(self, lat, lon):
         url = f"https://geo.fcc.gov/api/census/block/find?latitude={lat}&longitude={lon}&format=json"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("County", {}).get("name", "Unknown County")
+        async with self.session.get(url) as response:
+            if response.status == 200:
+                data = await response.json()
+                return data.get("County", {}).get("name", "Unknown County")
         return "Unknown County"
 
     async def handle_alert(self, guild, alert):
@@ -122,7 +230,8 @@ class SevereWeatherShutdown(commands.Cog):
             self.shutdown_pending = False
             if self.shutdown_timer_task:
                 self.shutdown_timer_task.cancel()
-            await ctx.send("Shutdown has been cancelled. Alerts will resume.")
+            # The alert stays marked as handled, so only a new alert starts another countdown
+            await ctx.send("Shutdown has been cancelled. This alert won't trigger again, but new alerts will.")
             return
 
         elif decision.lower() == "yes":
@@ -281,7 +390,7 @@ class SevereWeatherShutdown(commands.Cog):
             await ctx.send("Location not configured.")
             return
 
-        alerts = await fetch_alerts(lat, lon)
+        alerts = await fetch_alerts(self.session, lat, lon)
         if not alerts:
             await ctx.send("No active alerts found.")
             return
@@ -332,6 +441,36 @@ class SevereWeatherShutdown(commands.Cog):
         self.shutdown_pending = False
         await self.handle_alert(ctx.guild, fake_alert)
 
+    @weather.command()
+    async def risk(self, ctx):
+        """
+        Show the SPC day 1 outlook and any watches covering the configured location.
+        """
+        if not ctx.guild:
+            await ctx.send("This command can only be used in a server.")
+            return
+        if not self.overlay.loaded:
+            await ctx.send("SPC outlook and watch data haven't been loaded yet. Try again in a few minutes.")
+            return
+        risk = self.risk.get(ctx.guild.id)
+        if risk is None:
+            await ctx.send("Weather alerts are disabled or no location is configured.")
+            return
+
+        category, watches = risk
+        elevated = is_elevated(category, watches)
+        embed = discord.Embed(
+            title="Severe Weather Risk",
+            color=discord.Color.red() if elevated else discord.Color.blue()
+        )
+        outlook = CATEGORY_NAMES[CATEGORIES[category]] if self.overlay.outlook is not None else "Unavailable"
+        watch_list = (", ".join(watch_names(watches)) or "None") if self.overlay.watches is not None else "Unavailable"
+        embed.add_field(name="Day 1 Outlook", value=outlook)
+        embed.add_field(name="Watches", value=watch_list)
+        embed.add_field(name="Alert Checks", value=f"Every {self.alert_interval} minutes", inline=False)
+        embed.set_footer(text=f"Data from the Storm Prediction Center, updated {self.overlay.updated:%H:%M} UTC")
+        await ctx.send(embed=embed)
+
     @weather.command()
     async def currentweather(self, ctx):
         """
@@ -343,7 +482,7 @@ class SevereWeatherShutdown(commands.Cog):
             await ctx.send("Location not configured. Use `!weather setlocation` to set it.")
             return
 
-        conditions = await fetch_current_conditions(lat, lon)
+        conditions = await fetch_current_conditions(self.session, lat, lon)
         if not conditions:
             await ctx.send("Failed to fetch current weather conditions. Please ensure the location is valid and try again.")
             return
@@ -368,7 +507,7 @@ class SevereWeatherShutdown(commands.Cog):
         Display the latest mesoscale discussions from the SPC.
         """
         try:
-            discussions = await fetch_mesoscale_discussions()
+            discussions = await fetch_mesoscale_discussions(self.session)
             if not discussions:
                 await ctx.send("No mesoscale discussions available at the moment.")
                 return
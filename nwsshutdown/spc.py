@@ -0,0 +1,229 @@
+import asyncio
+import datetime
+import logging
+
+log = logging.getLogger("nwsshutdown")
+
+OUTLOOK_URL = "https://www.spc.noaa.gov/products/outlook/day1otlk_cat.nolyr.geojson"
+WATCHES_URL = "https://api.weather.gov/alerts/active"
+
+# Day 1 categorical outlook labels, lowest to highest; a cell stores the index
+CATEGORIES = ("NONE", "TSTM", "MRGL", "SLGT", "ENH", "MDT", "HIGH")
+CATEGORY_NAMES = {
+    "NONE": "No thunderstorms",
+    "TSTM": "General thunderstorms",
+    "MRGL": "Marginal risk",
+    "SLGT": "Slight risk",
+    "ENH": "Enhanced risk",
+    "MDT": "Moderate risk",
+    "HIGH": "High risk",
+}
+ELEVATED_CATEGORY = CATEGORIES.index("MDT")
+
+# Watch types as bit flags, so overlapping watches combine in one cell
+WATCH_FLAGS = {"Severe Thunderstorm Watch": 1, "Tornado Watch": 2}
+
+# CONUS at 0.05 degrees (about 5 km): 520 x 1180 cells, one byte each
+GRID_WEST, GRID_SOUTH, GRID_EAST, GRID_NORTH = -125.0, 24.0, -66.0, 50.0
+GRID_RES = 0.05
+GRID_ROWS = round((GRID_NORTH - GRID_SOUTH) / GRID_RES)
+GRID_COLS = round((GRID_EAST - GRID_WEST) / GRID_RES)
+
+
+def grid_cell(lat, lon):
+    """The (row, col) of the cell containing a point, or None outside the grid."""
+    row = int((lat - GRID_SOUTH) // GRID_RES)
+    col = int((lon - GRID_WEST) // GRID_RES)
+    if 0 <= row < GRID_ROWS and 0 <= col < GRID_COLS:
+        return row, col
+    return None
+
+
+def is_elevated(category, watches):
+    """Inside a watch, or in a moderate or high day 1 risk area."""
+    return bool(watches) or category >= ELEVATED_CATEGORY
+
+
+def watch_names(flags):
+    return [name for name, flag in WATCH_FLAGS.items() if flags & flag]
+
+
+def fill_polygon(rings, np):
+    """Rasterize one polygon (outer ring plus holes, [lon, lat] pairs) with an even-odd scanline fill.
+
+    Returns (first_row, last_row, mask) for the rows the polygon spans, or None.
+    """
+    edges = []
+    for ring in rings:
+        points = np.asarray(ring, dtype=float)
+        if points.ndim != 2 or len(points) < 3:
+            continue
+        points = points[:, :2]
+        edges.append(np.hstack([points, np.roll(points, -1, axis=0)]))
+    if not edges:
+        return None
+    x1, y1, x2, y2 = np.vstack(edges).T
+
+    low, high = np.minimum(y1, y2), np.maximum(y1, y2)
+    first = max(0, int((low.min() - GRID_SOUTH) // GRID_RES))
+    last = min(GRID_ROWS, int((high.max() - GRID_SOUTH) // GRID_RES) + 1)
+    if first >= last:
+        return None
+
+    # Where each row's centre line crosses each edge; half-open so a shared vertex counts once
+    centres = GRID_SOUTH + (np.arange(first, last) + 0.5) * GRID_RES
+    rows, hits = np.nonzero((centres[:, None] >= low) & (centres[:, None] < high))
+    y = centres[rows]
+    x = x1[hits] + (y - y1[hits]) / (y2[hits] - y1[hits]) * (x2[hits] - x1[hits])
+    # Every cell whose centre lies right of a crossing flips between outside and inside
+    cols = np.clip(np.ceil((x - GRID_WEST) / GRID_RES - 0.5), 0, GRID_COLS).astype(np.intp)
+    toggles = np.zeros((last - first, GRID_COLS + 1), dtype=np.int32)
+    np.add.at(toggles, (rows, cols), 1)
+    return first, last, np.cumsum(toggles[:, :GRID_COLS], axis=1) % 2 == 1
+
+
+def polygons(geometry):
+    if not geometry:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def rasterize(features, value_of, combine):
+    """Burn each feature's value into a uint8 CONUS grid, merging overlaps with `combine`."""
+    import numpy as np  # Only loaded once the overlay first runs
+
+    grid = np.zeros((GRID_ROWS, GRID_COLS), dtype=np.uint8)
+    for feature in features:
+        value = value_of(feature)
+        if not value:
+            continue
+        for rings in polygons(feature.get("geometry")):
+            filled = fill_polygon(rings, np)
+            if filled is None:
+                continue
+            first, last, mask = filled
+            combine(grid[first:last], (mask * value).astype(np.uint8), out=grid[first:last])
+    return grid
+
+
+def rasterize_outlook(geojson):
+    import numpy as np
+
+    def category(feature):
+        label = feature.get("properties", {}).get("LABEL")
+        return CATEGORIES.index(label) if label in CATEGORIES else 0
+
+    return rasterize(geojson.get("features", []), category, np.maximum)
+
+
+def rasterize_watches(geojson):
+    """Watch polygons as a grid of WATCH_FLAGS, plus {UGC zone: flags} for watches issued by county."""
+    import numpy as np
+
+    features = geojson.get("features", [])
+    zones = {}
+    for feature in features:
+        props = feature.get("properties", {})
+        flag = WATCH_FLAGS.get(props.get("event"), 0)
+        if not flag:
+            continue
+        # Watches are usually county-based and come without a geometry
+        for zone in props.get("geocode", {}).get("UGC", []):
+            zones[zone] = zones.get(zone, 0) | flag
+    grid = rasterize(features, lambda feature: WATCH_FLAGS.get(feature["properties"].get("event"), 0), np.bitwise_or)
+    return grid, zones
+
+
+class SPCOverlay:
+    """SPC day 1 outlook and active watches, rasterized for O(1) lookups by location."""
+
+    def __init__(self):
+        self.outlook = None  # uint8 grid of CATEGORIES indexes
+        self.watches = None  # uint8 grid of WATCH_FLAGS bits
+        self.watch_zones = {}  # {UGC zone: WATCH_FLAGS bits}
+        self.updated = None
+        self._validators = {}  # {url: (ETag, Last-Modified)} for conditional requests
+        self._zones = {}  # {(lat, lon): UGC county and forecast zone codes}
+
+    @property
+    def loaded(self):
+        """Whether either product has been downloaded; a lookup treats a missing one as clear."""
+        return self.outlook is not None or self.watches is not None
+
+    async def _get_json(self, session, url, params=None):
+        """GET a JSON document and its validators, or (None, None) if it hasn't changed."""
+        etag, last_modified = self._validators.get(url, (None, None))
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        async with session.get(url, params=params, headers=headers) as resp:
+            if resp.status == 304:
+                return None, None
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)
+            return data, (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+
+    async def _rasterize(self, url, result, rasterize):
+        """Rasterize a downloaded product, or None if it failed or hasn't changed."""
+        if isinstance(result, Exception):
+            log.error(f"Failed to download {url}: {result!r}")
+            return None
+        data, validators = result
+        if data is None:
+            return None
+        try:
+            grid = await asyncio.to_thread(rasterize, data)
+        except Exception:
+            log.exception(f"Failed to rasterize {url}")
+            return None
+        # Only now is the document in use; a failed one must be downloaded in full next time
+        self._validators[url] = validators
+        return grid
+
+    async def refresh(self, session):
+        """Download whichever products changed and rasterize them again.
+
+        Each product is handled on its own, so one failing keeps the other up to date.
+        """
+        outlook, watches = await asyncio.gather(
+            self._get_json(session, OUTLOOK_URL),
+            self._get_json(session, WATCHES_URL, {"event": ",".join(WATCH_FLAGS), "status": "actual"}),
+            return_exceptions=True,
+        )
+        outlook = await self._rasterize(OUTLOOK_URL, outlook, rasterize_outlook)
+        watches = await self._rasterize(WATCHES_URL, watches, rasterize_watches)
+        if outlook is not None:
+            self.outlook = outlook
+        if watches is not None:
+            self.watches, self.watch_zones = watches
+        if outlook is not None or watches is not None:
+            self.updated = datetime.datetime.now(datetime.timezone.utc)
+            log.info("SPC outlook and watch overlay updated.")
+
+    async def zones_for(self, session, lat, lon):
+        """The UGC county and forecast zone codes of a location, looked up once and cached."""
+        key = (lat, lon)
+        if key not in self._zones:
+            async with session.get(f"https://api.weather.gov/points/{lat},{lon}") as resp:
+                if resp.status != 200:
+                    log.error(f"Failed to fetch zones for ({lat}, {lon}): HTTP {resp.status}")
+                    return ()
+                props = (await resp.json()).get("properties", {})
+            urls = (props.get("county"), props.get("forecastZone"))
+            self._zones[key] = tuple(url.rstrip("/").rsplit("/", 1)[-1] for url in urls if url)
+        return self._zones[key]
+
+    def lookup(self, lat, lon, zones=()):
+        """(outlook category index, watch flags) at a location."""
+        cell = grid_cell(lat, lon)
+        category = int(self.outlook[cell]) if cell and self.outlook is not None else 0
+        watches = int(self.watches[cell]) if cell and self.watches is not None else 0
+        for zone in zones:
+            watches |= self.watch_zones.get(zone, 0)
+        return category, watches
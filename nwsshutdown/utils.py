@@ -1,81 +1,78 @@
-import aiohttp
 import logging
-from bs4 import BeautifulSoup
 
 log = logging.getLogger("nwsshutdown")
 
-async def fetch_alerts(lat, lon):
+async def fetch_alerts(session, lat, lon):
     url = f"https://api.weather.gov/alerts/active?point={lat},{lon}"
-    async with aiohttp.ClientSession() as session:  # Reuse session
-        try:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    log.error(f"Failed to fetch alerts: HTTP {resp.status}")
-                    return []
-                data = await resp.json()
-                return data.get("features", [])
-        except Exception as e:
-            log.error(f"Error fetching alerts: {e}")
-            return []
+    try:
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                log.error(f"Failed to fetch alerts: HTTP {resp.status}")
+                return []
+            data = await resp.json()
+            return data.get("features", [])
+    except Exception as e:
+        log.error(f"Error fetching alerts: {e}")
+        return []
 
-async def fetch_current_conditions(lat, lon):
+async def fetch_current_conditions(session, lat, lon):
     """
     Fetch the current weather conditions for a given latitude and longitude.
     """
     try:
-        async with aiohttp.ClientSession() as session:  # Reuse session
-            # Get the weather station ID from the point endpoint
-            point_url = f"https://api.weather.gov/points/{lat},{lon}"
-            async with session.get(point_url) as point_resp:
-                if point_resp.status != 200:
-                    log.error(f"Failed to fetch station info: HTTP {point_resp.status}")
-                    return None
-                point_data = await point_resp.json()
-                station_url = point_data.get("properties", {}).get("observationStations")
-                if not station_url:
-                    log.error("No observation stations found for the given location.")
-                    return None
+        # Get the weather station ID from the point endpoint
+        point_url = f"https://api.weather.gov/points/{lat},{lon}"
+        async with session.get(point_url) as point_resp:
+            if point_resp.status != 200:
+                log.error(f"Failed to fetch station info: HTTP {point_resp.status}")
+                return None
+            point_data = await point_resp.json()
+            station_url = point_data.get("properties", {}).get("observationStations")
+            if not station_url:
+                log.error("No observation stations found for the given location.")
+                return None
 
-            # Fetch the latest observation from the first station
-            async with session.get(station_url) as stations_resp:
-                if stations_resp.status != 200:
-                    log.error(f"Failed to fetch station list: HTTP {stations_resp.status}")
-                    return None
-                stations_data = await stations_resp.json()
-                stations = stations_data.get("observationStations", [])
-                if not stations:
-                    log.error("No stations available for the given location.")
-                    return None
-                station_id = stations[0].split("/")[-1]
+        # Fetch the latest observation from the first station
+        async with session.get(station_url) as stations_resp:
+            if stations_resp.status != 200:
+                log.error(f"Failed to fetch station list: HTTP {stations_resp.status}")
+                return None
+            stations_data = await stations_resp.json()
+            stations = stations_data.get("observationStations", [])
+            if not stations:
+                log.error("No stations available for the given location.")
+                return None
+            station_id = stations[0].split("/")[-1]
 
-            obs_url = f"https://api.weather.gov/stations/{station_id}/observations/latest"
-            async with session.get(obs_url) as obs_resp:
-                if obs_resp.status == 404:
-                    log.error(f"Station {station_id} does not have current observations.")
-                    return None
-                if obs_resp.status != 200:
-                    log.error(f"Failed to fetch current conditions: HTTP {obs_resp.status}")
-                    return None
-                obs_data = await obs_resp.json()
-                return obs_data.get("properties", {})
+        obs_url = f"https://api.weather.gov/stations/{station_id}/observations/latest"
+        async with session.get(obs_url) as obs_resp:
+            if obs_resp.status == 404:
+                log.error(f"Station {station_id} does not have current observations.")
+                return None
+            if obs_resp.status != 200:
+                log.error(f"Failed to fetch current conditions: HTTP {obs_resp.status}")
+                return None
+            obs_data = await obs_resp.json()
+            return obs_data.get("properties", {})
     except Exception as e:
         log.error(f"Error fetching current conditions: {e}")
         return None
 
-async def fetch_mesoscale_discussions():
+async def fetch_mesoscale_discussions(session):
     """
     Fetch the latest mesoscale discussions from the SPC.
     """
     url = "https://www.spc.noaa.gov/products/md/"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    log.error(f"Failed to fetch mesoscale discussions: HTTP {resp.status}")
-                    return None
-                html = await resp.text()
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                log.error(f"Failed to fetch mesoscale discussions: HTTP {resp.status}")
+                return None
+            html = await resp.text()
 
         # Parse the HTML to extract mesoscale discussions (basic scraping)
+        from bs4 import BeautifulSoup  # Only needed by this command, so keep it off the load path
+
         soup = BeautifulSoup(html, "html.parser")
         discussions = []
         for item in soup.select("pre a"):
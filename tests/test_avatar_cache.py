@@ -0,0 +1,32 @@
+import asyncio
+
+from announcements.avatar_cache import AvatarCache
+
+
+def fill(cache, *digests):
+    """Put 100-byte entries on disk and in the LRU, oldest first."""
+    cache.directory.mkdir(parents=True, exist_ok=True)
+    for digest in digests:
+        (cache.directory / f"{digest}_128.png").write_bytes(b"x" * 100)
+        cache.entries[digest] = 100
+        cache.total_bytes += 100
+
+
+def test_evict_skips_linked_avatars(tmp_path):
+    cache = AvatarCache(tmp_path, max_bytes=200, pinned=lambda: {"aa"})
+    fill(cache, "aa", "bb", "cc", "dd")
+    asyncio.run(cache._evict())
+    # The oldest entry is still linked to, so the next ones go instead
+    assert list(cache.entries) == ["aa", "dd"] and cache.total_bytes == 200
+    assert cache.resolve("aa", 128) and cache.resolve("bb", 128) is None
+    assert not list(tmp_path.glob("bb_*"))
+
+
+def test_evicted_avatar_keeps_its_source(tmp_path):
+    cache = AvatarCache(tmp_path, max_bytes=100)
+    fill(cache, "aa", "bb")
+    cache._sources["https://cdn.discordapp.com/avatars/1/a.png"] = "aa"
+    asyncio.run(cache._evict())
+    assert cache.resolve("aa", 128) is None
+    assert cache.source("aa") == "https://cdn.discordapp.com/avatars/1/a.png"
+    assert cache.source("ff") is None
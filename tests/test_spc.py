@@ -0,0 +1,165 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from nwsshutdown import spc
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load(name):
+    return json.loads((FIXTURES / name).read_text())
+
+
+def category(name):
+    return spc.CATEGORIES.index(name)
+
+
+@pytest.fixture(scope="module")
+def overlay():
+    overlay = spc.SPCOverlay()
+    overlay.outlook = spc.rasterize_outlook(load("day1otlk_cat.nolyr.geojson"))
+    overlay.watches, overlay.watch_zones = spc.rasterize_watches(load("nws_watches.json"))
+    return overlay
+
+
+@pytest.mark.parametrize("lat, lon, expected", [
+    (44.0, -104.0, "TSTM"),
+    (34.0, -99.0, "MRGL"),
+    (39.5, -93.0, "SLGT"),
+    (36.5, -96.0, "ENH"),
+    (37.5, -96.0, "MDT"),  # Hole in ENH filled by the first MDT polygon
+    (40.5, -79.5, "MDT"),  # Second polygon of the MultiPolygon
+    (37.5, -91.0, "MRGL"),
+    (46.0, -100.0, "NONE"),
+])
+def test_outlook_nested_categories_and_holes(overlay, lat, lon, expected):
+    assert overlay.lookup(lat, lon) == (category(expected), 0)
+
+
+def test_outlook_shared_edges_leave_no_gaps():
+    grid = spc.rasterize_outlook(load("day1otlk_cat.nolyr.geojson"))
+    # Adjacent categories share edges, so no cell may be left out between them
+    row, col = spc.grid_cell(37.5, -96.0)
+    assert grid[row - 15:row + 15, col - 15:col + 15].min() >= category("ENH")
+
+
+def test_watches_by_polygon_and_ugc_zone(overlay):
+    assert overlay.watch_zones == {"OKC109": 2, "OKC027": 2, "OKC017": 2, "TNC037": 1, "TNC149": 1}
+    # Severe thunderstorm watch polygon
+    assert overlay.lookup(36.0, -87.0) == (category("TSTM"), 1)
+    # The tornado watch has no geometry, so it is only found by zone
+    assert overlay.lookup(35.2, -97.4) == (category("SLGT"), 0)
+    assert overlay.lookup(35.2, -97.4, ("OKC027", "OKZ025")) == (category("SLGT"), 2)
+    assert spc.watch_names(1 | 2) == ["Severe Thunderstorm Watch", "Tornado Watch"]
+
+
+def test_is_elevated(overlay):
+    assert spc.is_elevated(*overlay.lookup(37.5, -96.0))
+    assert spc.is_elevated(*overlay.lookup(36.0, -87.0))  # General thunderstorms, but inside a watch
+    assert not spc.is_elevated(*overlay.lookup(36.5, -96.0))
+    assert not spc.is_elevated(*overlay.lookup(20.0, -96.0))  # Outside the grid
+
+
+class StubResponse:
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(self.status)
+
+    async def json(self, content_type=None):
+        return self.data
+
+
+class StubSession:
+    """Serves the fixtures with validators and answers 304 to matching conditional requests.
+
+    A document set to None is answered with a 503.
+    """
+
+    def __init__(self):
+        self.documents = {
+            spc.OUTLOOK_URL: (load("day1otlk_cat.nolyr.geojson"), {"ETag": '"otlk-1"'}),
+            spc.WATCHES_URL: (load("nws_watches.json"), {"Last-Modified": "Tue, 07 May 2024 00:10:00 GMT"}),
+        }
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        data, validators = self.documents[url]
+        if data is None:
+            return StubResponse(503)
+        etag, last_modified = validators.get("ETag"), validators.get("Last-Modified")
+        if (etag and headers.get("If-None-Match") == etag) or (
+            last_modified and headers.get("If-Modified-Since") == last_modified
+        ):
+            return StubResponse(304)
+        return StubResponse(200, data, validators)
+
+
+def test_refresh_skips_unchanged_products():
+    async def main():
+        overlay = spc.SPCOverlay()
+        session = StubSession()
+        await overlay.refresh(session)
+        outlook, watches, updated = overlay.outlook, overlay.watches, overlay.updated
+        assert overlay.loaded and updated is not None
+
+        await overlay.refresh(session)
+        conditional = dict(session.requests[2:])
+        assert conditional[spc.OUTLOOK_URL] == {"If-None-Match": '"otlk-1"'}
+        assert conditional[spc.WATCHES_URL] == {"If-Modified-Since": "Tue, 07 May 2024 00:10:00 GMT"}
+        # Nothing changed, so nothing was rasterized again
+        assert overlay.outlook is outlook and overlay.watches is watches and overlay.updated == updated
+
+    asyncio.run(main())
+
+
+def test_refresh_keeps_going_when_one_product_fails():
+    async def main():
+        overlay = spc.SPCOverlay()
+        session = StubSession()
+        watches = session.documents[spc.WATCHES_URL]
+        session.documents[spc.WATCHES_URL] = (None, {})
+        await overlay.refresh(session)
+        # The outlook still loads, and the failed product keeps no validators
+        assert overlay.loaded and overlay.outlook is not None and overlay.watches is None
+        assert spc.WATCHES_URL not in overlay._validators
+
+        session.documents[spc.WATCHES_URL] = watches
+        await overlay.refresh(session)
+        assert overlay.watch_zones["OKC027"] == 2
+        assert overlay.lookup(36.0, -87.0) == (category("TSTM"), 1)
+
+    asyncio.run(main())
+
+
+def test_refresh_downloads_again_after_a_bad_document():
+    async def main():
+        overlay = spc.SPCOverlay()
+        session = StubSession()
+        outlook = session.documents[spc.OUTLOOK_URL]
+        session.documents[spc.OUTLOOK_URL] = (["not", "geojson"], outlook[1])
+        await overlay.refresh(session)
+        assert overlay.outlook is None and overlay.watches is not None
+
+        # The same ETag must not be answered with a 304 once SPC fixes the document
+        session.documents[spc.OUTLOOK_URL] = outlook
+        await overlay.refresh(session)
+        assert "If-None-Match" not in dict(session.requests[2:])[spc.OUTLOOK_URL]
+        assert overlay.lookup(37.5, -96.0)[0] == category("MDT")
+
+    asyncio.run(main())
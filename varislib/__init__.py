@@ -0,0 +1 @@
+"""Code shared by the varis-utils cogs. Installed automatically alongside any of them."""
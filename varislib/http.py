@@ -0,0 +1,125 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+from . import metrics
+
+log = logging.getLogger("red.varislib")
+
+REQUESTS = metrics.counter("varis_http_requests_total", "Outgoing HTTP requests started.", ("host",))
+ERRORS = metrics.counter("varis_http_errors_total", "Outgoing HTTP requests that failed without a response.", ("host",))
+RESPONSES = metrics.counter("varis_http_responses_total", "Outgoing HTTP responses by status code.", ("host", "status"))
+DURATION = metrics.histogram("varis_http_request_duration_seconds", "Outgoing HTTP request latency.", ("host",))
+CONNECTIONS = metrics.counter("varis_http_connections_total", "Connections used for outgoing requests.", ("host", "reused"))
+QUEUED = metrics.gauge("varis_http_queued_requests", "Requests waiting for a free pooled connection.", ("host",))
+QUEUE_WAIT = metrics.histogram("varis_http_queue_wait_seconds", "Time spent waiting for a free pooled connection.", ("host",))
+
+USER_AGENT = "varis-utils (github.com/dasKreuzer/varis-utils)"
+
+# Hosts with the same connection policy share one session. limit_per_host caps concurrent
+# connections to a single host; timeout is the default total budget for one request.
+GROUPS = {
+    "default": {"limit_per_host": 10, "timeout": 30},
+    # api.weather.gov rejects requests without an identifying User-Agent
+    "weather": {"limit_per_host": 6, "timeout": 20, "headers": {"User-Agent": USER_AGENT}},
+    "pterodactyl": {"limit_per_host": 4, "timeout": 15},
+    "fivem": {"limit_per_host": 4, "timeout": 5, "headers": {"User-Agent": USER_AGENT}},
+    "discord-cdn": {"limit_per_host": 8, "timeout": 10},
+}
+
+
+class HTTPPool:
+    """One keep-alive session per host group, shared by every varis-utils cog."""
+
+    def __init__(self, groups=GROUPS):
+        self.groups = groups
+        self._sessions = {}
+
+    def session(self, group="default"):
+        """The pooled session for a host group, created on first use."""
+        session = self._sessions.get(group)
+        if session is None or session.closed:
+            settings = {**self.groups["default"], **self.groups.get(group, {})}
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=settings["limit_per_host"],
+                ttl_dns_cache=300,
+                keepalive_timeout=30,
+            )
+            session = self._sessions[group] = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings["timeout"], connect=min(10, settings["timeout"])),
+                headers=settings.get("headers"),
+                trace_configs=[self._trace_config()],
+            )
+        return session
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+    @staticmethod
+    def _trace_config():
+        """Record per-host request counts, latency and connection pool saturation."""
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(host=None))
+
+        async def request_start(session, ctx, params):
+            ctx.host = params.url.host
+            ctx.started = time.perf_counter()
+            REQUESTS.inc(host=ctx.host)
+
+        async def request_end(session, ctx, params):
+            DURATION.observe(time.perf_counter() - ctx.started, host=ctx.host)
+            RESPONSES.inc(host=ctx.host, status=params.response.status)
+
+        async def request_exception(session, ctx, params):
+            ERRORS.inc(host=ctx.host)
+
+        async def queued_start(session, ctx, params):
+            ctx.queued_at = time.perf_counter()
+            QUEUED.inc(host=ctx.host)
+
+        async def queued_end(session, ctx, params):
+            QUEUED.dec(host=ctx.host)
+            QUEUE_WAIT.observe(time.perf_counter() - ctx.queued_at, host=ctx.host)
+
+        async def connection_created(session, ctx, params):
+            CONNECTIONS.inc(host=ctx.host, reused="false")
+
+        async def connection_reused(session, ctx, params):
+            CONNECTIONS.inc(host=ctx.host, reused="true")
+
+        trace.on_request_start.append(request_start)
+        trace.on_request_end.append(request_end)
+        trace.on_request_exception.append(request_exception)
+        trace.on_connection_queued_start.append(queued_start)
+        trace.on_connection_queued_end.append(queued_end)
+        trace.on_connection_create_end.append(connection_created)
+        trace.on_connection_reuseconn.append(connection_reused)
+        return trace
+
+
+_pool = None
+_owners = set()
+
+
+def acquire(owner):
+    """Register a cog as a user of the shared pool and return it. Call from cog_load."""
+    global _pool
+    if _pool is None:
+        _pool = HTTPPool()
+    _owners.add(owner)
+    return _pool
+
+
+async def release(owner):
+    """Drop a cog's claim on the shared pool, closing it once no cog uses it. Call from cog_unload."""
+    global _pool
+    _owners.discard(owner)
+    if not _owners and _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+        log.info("Shared HTTP pool closed.")
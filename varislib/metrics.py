@@ -0,0 +1,200 @@
+"""In-process metrics shared by the varis-utils cogs, rendered in the Prometheus text format."""
+import functools
+import math
+import time
+from bisect import bisect_left
+
+# Seconds; covers everything from a cached API hit to a slow NWS fetch
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _sorted(values):
+    return sorted(values.items(), key=lambda item: tuple(map(str, item[0])))
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # {label values: value}
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in _sorted(self.values):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * len(self.buckets), 0.0, 0]  # [bucket counts, sum, count]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels):
+        series = self.values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def mean(self, **labels):
+        series = self.values.get(self._key(labels))
+        return series[1] / series[2] if series and series[2] else None
+
+    def percentile(self, p, **labels):
+        """Upper bound of the bucket holding the p-th percentile."""
+        series = self.values.get(self._key(labels))
+        if not series or not series[2]:
+            return None
+        rank = p / 100 * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets, series[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in _sorted(self.values):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        # Cogs re-register their metrics on every reload, so return the existing one
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help, labelnames, **kwargs)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+
+CALLS = counter("varis_calls_total", "Completed runs of an instrumented loop, listener or route.", ("name",))
+ERRORS = counter("varis_errors_total", "Runs of an instrumented loop, listener or route that raised.", ("name",))
+IN_FLIGHT = gauge("varis_in_flight", "Runs of an instrumented loop, listener or route in progress.", ("name",))
+DURATION = histogram("varis_duration_seconds", "Duration of an instrumented loop, listener or route.", ("name",))
+
+
+class track:
+    """Context manager recording one run of `name`: duration, count, errors and in-flight."""
+
+    def __init__(self, name, ignore=()):
+        self.name = name
+        self.ignore = ignore  # Exception types that are expected outcomes rather than errors
+
+    def __enter__(self):
+        IN_FLIGHT.inc(name=self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        IN_FLIGHT.dec(name=self.name)
+        DURATION.observe(time.perf_counter() - self.started, name=self.name)
+        CALLS.inc(name=self.name)
+        # Cancellation is a BaseException and not counted as an error
+        if exc_type is not None and issubclass(exc_type, Exception) and not issubclass(exc_type, self.ignore):
+            ERRORS.inc(name=self.name)
+        return False
+
+
+def instrument(name):
+    """Decorate a coroutine function (method, listener or loop body) so every call is tracked."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,108 @@
+import io
+
+import discord
+from redbot.core import commands
+from redbot.core.utils.chat_formatting import box, pagify
+
+from . import http, metrics
+from .profiler import SamplingProfiler
+
+_owners = set()
+
+
+def _ms(seconds):
+    if seconds is None:
+        return "-"
+    if seconds == float("inf"):
+        return "inf"
+    return f"{seconds * 1000:.1f}ms"
+
+
+class VarisMetrics(commands.Cog):
+    """Metrics and profiling for the varis-utils cogs. Added automatically while any of them is loaded."""
+
+    def __init__(self):
+        self.profiler = SamplingProfiler()
+
+    async def cog_unload(self):
+        self.profiler.stop()
+
+    async def red_delete_data_for_user(self, **kwargs):
+        return  # No user data is stored
+
+    @commands.group(invoke_without_command=True)
+    @commands.is_owner()
+    async def varismetrics(self, ctx):
+        """Show run counts, errors and latency of the instrumented loops, listeners and API routes."""
+        lines = [f"{'name':<60} {'runs':>7} {'errors':>6} {'active':>6} {'mean':>8} {'p95':>8}"]
+        for (name,), runs in sorted(metrics.CALLS.values.items()):
+            lines.append(
+                f"{name:<60} {runs:>7} {metrics.ERRORS.get(name=name):>6} {metrics.IN_FLIGHT.get(name=name):>6} "
+                f"{_ms(metrics.DURATION.mean(name=name)):>8} {_ms(metrics.DURATION.percentile(95, name=name)):>8}"
+            )
+
+        if http.REQUESTS.values:
+            lines += ["", f"{'host':<60} {'reqs':>7} {'errors':>6} {'queued':>6} {'mean':>8} {'p95':>8}"]
+            for (host,), requests in sorted(http.REQUESTS.values.items()):
+                lines.append(
+                    f"{host:<60} {requests:>7} {http.ERRORS.get(host=host):>6} {http.QUEUED.get(host=host):>6} "
+                    f"{_ms(http.DURATION.mean(host=host)):>8} {_ms(http.DURATION.percentile(95, host=host)):>8}"
+                )
+
+        if len(lines) == 1:
+            await ctx.send("Nothing has been recorded yet.")
+            return
+        for page in pagify("\n".join(lines)):
+            await ctx.send(box(page))
+
+    @varismetrics.command(name="prometheus")
+    async def varismetrics_prometheus(self, ctx):
+        """Upload every metric in the Prometheus text format."""
+        data = io.BytesIO(metrics.render().encode())
+        await ctx.send(file=discord.File(data, filename="varis-metrics.txt"))
+
+    @varismetrics.group(name="profile", invoke_without_command=True)
+    async def varismetrics_profile(self, ctx, limit: int = 15, cumulative: bool = False):
+        """Show the hottest functions seen by the sampling profiler.
+
+        With `cumulative` set, time spent in callees counts towards the caller.
+        """
+        profiler = self.profiler
+        if not profiler.samples:
+            await ctx.send(f"No samples yet. Start the profiler with `{ctx.clean_prefix}varismetrics profile start`.")
+            return
+        state = "running" if profiler.running else "stopped"
+        lines = [f"{profiler.samples} samples every {profiler.interval * 1000:.0f}ms ({state})", ""]
+        lines += [f"{share:6.1%} {count:>7}  {function}" for function, count, share in profiler.top(limit, cumulative)]
+        for page in pagify("\n".join(lines)):
+            await ctx.send(box(page))
+
+    @varismetrics_profile.command(name="start")
+    async def varismetrics_profile_start(self, ctx, interval_ms: int = 10):
+        """Start sampling the event loop's stack."""
+        if self.profiler.running:
+            await ctx.send("The profiler is already running.")
+            return
+        self.profiler.interval = max(interval_ms, 1) / 1000
+        self.profiler.start()
+        await ctx.send(f"Profiler started, sampling every {interval_ms}ms.")
+
+    @varismetrics_profile.command(name="stop")
+    async def varismetrics_profile_stop(self, ctx):
+        """Stop the profiler, keeping its samples."""
+        self.profiler.stop()
+        await ctx.send(f"Profiler stopped after {self.profiler.samples} samples.")
+
+
+async def attach(bot, owner):
+    """Register a cog as a user of VarisMetrics, adding the cog if needed. Call from cog_load."""
+    _owners.add(owner)
+    if bot.get_cog("VarisMetrics") is None:
+        await bot.add_cog(VarisMetrics())
+
+
+async def detach(bot, owner):
+    """Drop a cog's claim on VarisMetrics, removing the cog once nothing uses it. Call from cog_unload."""
+    _owners.discard(owner)
+    if not _owners and bot.get_cog("VarisMetrics") is not None:
+        await bot.remove_cog("VarisMetrics")
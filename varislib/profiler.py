@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler: samples one thread's stack from a background thread.
+
+    Sampling costs nothing while stopped, so it can be switched on in a live bot to find
+    what the event loop is busy with, then switched off again.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = 0
+        self.own = Counter()  # {function: samples where it was the innermost frame}
+        self.total = Counter()  # {function: samples where it was anywhere on the stack}
+        self._target = None
+        self._lock = threading.Lock()  # Held by the sampler while it updates the counters
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, thread_id=None):
+        """Start sampling `thread_id` (by default the calling thread, i.e. the event loop)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            self.samples = 0
+            self.own.clear()
+            self.total.clear()
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="varis-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            own = self._key(frame)
+            stack = set()  # Recursive functions count once per sample
+            while frame is not None:
+                stack.add(self._key(frame))
+                frame = frame.f_back
+            with self._lock:
+                self.samples += 1
+                self.own[own] += 1
+                self.total.update(stack)
+
+    @staticmethod
+    def _key(frame):
+        code = frame.f_code
+        path = os.sep.join(code.co_filename.split(os.sep)[-2:])
+        return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+    def top(self, limit=15, cumulative=False):
+        """The hottest functions as (function, samples, share of all samples)."""
+        # Copy under the lock: the sampler thread adds keys while the profiler runs
+        with self._lock:
+            counts = Counter(self.total if cumulative else self.own)
+            samples = self.samples
+        return [(key, count, count / samples) for key, count in counts.most_common(limit)] if samples else []
@@ -0,0 +1,100 @@
+"""Compact on-disk snapshots of a cog's runtime state, so a reload or restart starts warm."""
+import asyncio
+import logging
+import marshal
+import os
+import struct
+import time
+import zlib
+
+log = logging.getLogger("red.varislib")
+
+MAGIC = b"VSNP"
+VERSION = 1
+# magic, format version, marshal version, saved_at (epoch seconds), crc32 of the payload
+HEADER = struct.Struct("<4sHHdI")
+
+
+def write_snapshot(path, data):
+    """Atomically replace `path` with a snapshot of `data` (marshal-able builtins only)."""
+    payload = marshal.dumps(data)
+    header = HEADER.pack(MAGIC, VERSION, marshal.version, time.time(), zlib.crc32(payload))
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(header + payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    return len(header) + len(payload)
+
+
+def read_snapshot(path, max_age=None):
+    """Return (saved_at, data), or None if the snapshot is missing, unreadable or older than `max_age` seconds."""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    magic, version, marshal_version, saved_at, crc = HEADER.unpack_from(raw)
+    payload = raw[HEADER.size:]
+    # marshal's format is tied to the interpreter, so snapshots from another version are discarded
+    if magic != MAGIC or version != VERSION or marshal_version != marshal.version or zlib.crc32(payload) != crc:
+        log.warning(f"Ignoring unreadable snapshot {path}")
+        return None
+    if max_age is not None and time.time() - saved_at > max_age:
+        log.info(f"Ignoring snapshot {path} from {time.time() - saved_at:.0f}s ago")
+        return None
+    try:
+        return saved_at, marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        log.warning(f"Ignoring corrupt snapshot {path}")
+        return None
+
+
+class SnapshotStore:
+    """Periodically snapshot a cog's state and restore it on load.
+
+    `collect` is a callable returning the state to save. It runs on the event loop,
+    so it only copies the state; serializing and writing happen in a worker thread.
+    """
+
+    def __init__(self, path, collect, interval=300, max_age=6 * 3600):
+        self.path = str(path)
+        self.collect = collect
+        self.interval = interval
+        self.max_age = max_age
+        self._task = None
+
+    async def load(self):
+        """The saved state, or None if there is no fresh snapshot."""
+        snapshot = await asyncio.to_thread(read_snapshot, self.path, self.max_age)
+        return snapshot[1] if snapshot else None
+
+    async def save(self):
+        """Write a snapshot now. Never raises, so callers and the periodic task keep running."""
+        try:
+            await asyncio.to_thread(write_snapshot, self.path, self.collect())
+        except Exception as e:
+            # Includes errors from collect(), e.g. state changing size while it is copied
+            log.error(f"Failed to write snapshot {self.path}: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic writes and save one last snapshot."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.save()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception as e:
+                log.error(f"Error in snapshot task for {self.path}: {e}")